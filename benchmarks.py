@@ -0,0 +1,974 @@
+"""
+Benchmarks for data_structures.
+
+Usage:
+    python benchmarks.py btree [--size N]
+    python benchmarks.py concurrent_queue [--size N]
+    python benchmarks.py shared_memory_queue [--size N]
+    python benchmarks.py linked_list_memory [--size N]
+    python benchmarks.py skip_list [--size N]
+    python benchmarks.py priority_queue [--size N]
+    python benchmarks.py suite [--size N] [--output FILE] [--baseline FILE]
+
+The suite times every public operation of the core structures at sizes
+10^3..N (use --size 10000000 for the full range), fits the scaling
+exponent of each once there are at least three sizes (N >= 100000) and
+exits non-zero when one grows faster than its declared complexity or
+regresses against a baseline report.
+"""
+import argparse
+import gc
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
+import operator
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import deque
+
+import data_structures
+
+
+def _measure_build(build):
+    """
+    Run build() under tracemalloc and return (result, bytes allocated, seconds).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated, elapsed
+
+
+def _ops_per_sec(operation, items):
+    start = time.perf_counter()
+    for item in items:
+        operation(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def bench_btree(size: int) -> None:
+    """
+    Compare lookup throughput and bytes per key of BTree and BinarySearchTree.
+    """
+    rng = random.Random(0)
+    keys = rng.sample(range(size * 10), size)
+    probes = rng.sample(keys, min(size, 100_000))
+
+    def build_bst(balanced):
+        tree = data_structures.BinarySearchTree(balanced=balanced)
+        for key in keys:
+            tree.insert(key)
+        return tree
+
+    def build_btree(fanout):
+        tree = data_structures.BTree(fanout=fanout)
+        for key in keys:
+            tree.insert(key)
+        return tree
+
+    candidates = [
+        ("BinarySearchTree", lambda: build_bst(False)),
+        ("BinarySearchTree(balanced)", lambda: build_bst(True)),
+        ("BTree(fanout=32)", lambda: build_btree(32)),
+        ("BTree(fanout=128)", lambda: build_btree(128)),
+    ]
+    print(f"{'structure':<28}{'bytes/key':>12}{'lookups/s':>14}{'build s':>10}")
+    for name, build in candidates:
+        tree, allocated, elapsed = _measure_build(build)
+        lookups = _ops_per_sec(tree.search, probes)
+        print(f"{name:<28}{allocated / size:>12.1f}{lookups:>14,.0f}{elapsed:>10.2f}")
+
+
+def _run_threads(producer, consumer, threads):
+    workers = [threading.Thread(target=producer) for _ in range(threads)]
+    workers += [threading.Thread(target=consumer) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def _locked_polling_run(size, threads):
+    queue = data_structures.Queue()
+    lock = threading.Lock()
+    per_producer = size // threads
+    consumed = [0]
+
+    def producer():
+        for value in range(per_producer):
+            with lock:
+                queue.enqueue(value)
+
+    def consumer():
+        while True:
+            with lock:
+                if consumed[0] >= per_producer * threads:
+                    return
+                if not queue.is_empty():
+                    queue.dequeue()
+                    consumed[0] += 1
+                    continue
+            time.sleep(0)
+
+    return _run_threads(producer, consumer, threads)
+
+
+def _concurrent_queue_run(size, threads):
+    queue = data_structures.ConcurrentQueue(maxsize=4096)
+    per_producer = size // threads
+    done = []
+
+    def producer():
+        for value in range(per_producer):
+            queue.put(value)
+        done.append(True)
+        if len(done) == threads:
+            queue.close()
+
+    def consumer():
+        try:
+            while True:
+                queue.get_many(256)
+        except data_structures.QueueClosed:
+            pass
+
+    return _run_threads(producer, consumer, threads)
+
+
+def bench_concurrent_queue(size: int) -> None:
+    """
+    Compare ConcurrentQueue against a Queue guarded by one lock with
+    busy-polling consumers, for 1-32 producer/consumer pairs.
+    """
+    print(f"{'threads':>8}{'lock+poll items/s':>20}{'ConcurrentQueue items/s':>26}")
+    for threads in (1, 2, 4, 8, 16, 32):
+        polling = _locked_polling_run(size, threads)
+        blocking = _concurrent_queue_run(size, threads)
+        total = size // threads * threads
+        print(f"{threads:>8}{total / polling:>20,.0f}{total / blocking:>26,.0f}")
+
+
+_BATCH = 1000
+
+
+# Producers reuse one prebuilt payload so only the transport is timed.
+
+
+def _mp_queue_producer(queue, size, batched):
+    if batched:
+        batch = list(range(_BATCH))
+        for _ in range(size // _BATCH):
+            queue.put(batch)
+    else:
+        for value in range(size):
+            queue.put(value)
+
+
+def _shm_queue_producer(queue, size):
+    batch = array("q", range(_BATCH))
+    for _ in range(size // _BATCH):
+        while True:
+            try:
+                queue.enqueue_many(batch)
+                break
+            except IndexError:
+                time.sleep(0)
+    queue.close()
+
+
+def _timed_transfer(producer, args, consume):
+    process = multiprocessing.Process(target=producer, args=args)
+    start = time.perf_counter()
+    process.start()
+    consume()
+    process.join()
+    return time.perf_counter() - start
+
+
+def bench_shared_memory_queue(size: int) -> None:
+    """
+    Compare cross-process throughput of SharedMemoryQueue and multiprocessing.Queue.
+    """
+    size -= size % _BATCH
+    results = []
+    for batched in (False, True):
+        queue = multiprocessing.Queue()
+
+        def consume():
+            received = 0
+            while received < size:
+                item = queue.get()
+                received += len(item) if batched else 1
+
+        elapsed = _timed_transfer(_mp_queue_producer, (queue, size, batched), consume)
+        label = f"batches of {_BATCH}" if batched else "single items"
+        results.append((f"multiprocessing.Queue ({label})", elapsed))
+
+    queue = data_structures.SharedMemoryQueue(64 * _BATCH)
+
+    def consume():
+        received = 0
+        while received < size:
+            batch = queue.dequeue_many(_BATCH)
+            if not batch:
+                time.sleep(0)
+            received += len(batch)
+
+    elapsed = _timed_transfer(_shm_queue_producer, (queue, size), consume)
+    queue.close()
+    queue.unlink()
+    results.append((f"SharedMemoryQueue (batches of {_BATCH})", elapsed))
+
+    print(f"{'transport':<44}{'items/s':>14}")
+    for name, elapsed in results:
+        print(f"{name:<44}{size / elapsed:>14,.0f}")
+
+
+class _DictNode:
+    """
+    A node with a per-instance __dict__, as Node/DoubleNode were before
+    they gained __slots__; used as the "before" baseline.
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.next = None
+        self.prev = None
+
+
+def _dict_node_chain(values):
+    head = tail = None
+    for value in values:
+        node = _DictNode(value)
+        if head is None:
+            head = node
+        else:
+            tail.next = node
+            node.prev = tail
+        tail = node
+    return head
+
+
+def _filled(factory, values):
+    linked_list = factory()
+    for value in values:
+        linked_list.append(value)
+    return linked_list
+
+
+def _iterate_nodes(head):
+    node = head
+    while node is not None:
+        node = node.next
+
+
+def bench_linked_list_memory(size: int) -> None:
+    """
+    Report bytes per element and full-traversal time of the object-node and
+    compact linked lists. Values are shared, so only structure is counted.
+    """
+    values = list(range(size))
+    candidates = [
+        (
+            "dict nodes (before __slots__)",
+            lambda: _dict_node_chain(values),
+            _iterate_nodes,
+        ),
+        (
+            "SinglyLinkedList",
+            lambda: _filled(data_structures.SinglyLinkedList, values),
+            lambda linked_list: _iterate_nodes(linked_list.head),
+        ),
+        (
+            "DoublyLinkedList",
+            lambda: _filled(data_structures.DoublyLinkedList, values),
+            lambda linked_list: _iterate_nodes(linked_list.head),
+        ),
+        (
+            "CompactSinglyLinkedList",
+            lambda: _filled(data_structures.CompactSinglyLinkedList, values),
+            lambda linked_list: sum(1 for _ in linked_list),
+        ),
+        (
+            "CompactDoublyLinkedList",
+            lambda: _filled(data_structures.CompactDoublyLinkedList, values),
+            lambda linked_list: sum(1 for _ in linked_list),
+        ),
+        (
+            "CompactDoublyLinkedList(i8)",
+            lambda: _filled(
+                lambda: data_structures.CompactDoublyLinkedList("i8"), values
+            ),
+            lambda linked_list: sum(1 for _ in linked_list),
+        ),
+    ]
+    print(f"{'structure':<32}{'bytes/element':>15}{'traverse ms':>13}")
+    for name, build, traverse in candidates:
+        linked_list, allocated, _ = _measure_build(build)
+        start = time.perf_counter()
+        traverse(linked_list)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<32}{allocated / size:>15.1f}{elapsed * 1000:>13.1f}")
+
+
+class _LockedTree:
+    """
+    BinarySearchTree behind one lock for readers and writers alike, the
+    usual way to share it between threads.
+    """
+
+    def __init__(self):
+        self.tree = data_structures.BinarySearchTree(balanced=True)
+        self.lock = threading.Lock()
+
+    def insert(self, value):
+        with self.lock:
+            self.tree.insert(value)
+
+    def delete(self, value):
+        with self.lock:
+            self.tree.delete(value)
+
+    def search(self, value):
+        with self.lock:
+            return self.tree.search(value)
+
+
+def _mixed_workload(structure, keys, readers, duration):
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def reader(slot):
+        rng = random.Random(slot)
+        count = 0
+        while not stop.is_set():
+            for _ in range(100):
+                structure.search(rng.choice(keys))
+            count += 100
+        reads[slot] = count
+
+    def writer():
+        rng = random.Random(-1)
+        while not stop.is_set():
+            key = rng.choice(keys)
+            structure.delete(key)
+            structure.insert(key)
+            writes[0] += 2
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / duration, writes[0] / duration
+
+
+def bench_skip_list(size: int) -> None:
+    """
+    Compare SkipList (lock-free readers) against a lock-guarded balanced
+    BinarySearchTree with one writer and 1-16 reader threads.
+    """
+    keys = random.Random(0).sample(range(size * 10), size)
+    factories = [
+        ("BinarySearchTree+lock", _LockedTree),
+        ("SkipList", data_structures.SkipList),
+    ]
+    print(f"{'structure':<24}{'readers':>8}{'reads/s':>14}{'writes/s':>12}")
+    for name, factory in factories:
+        structure = factory()
+        for key in keys:
+            structure.insert(key)
+        for readers in (1, 4, 16):
+            reads, writes = _mixed_workload(structure, keys, readers, 1.0)
+            print(f"{name:<24}{readers:>8}{reads:>14,.0f}{writes:>12,.0f}")
+
+
+def _heapq_run(pairs, decreases):
+    heap = [(priority, value) for value, priority in pairs]
+    heapq.heapify(heap)
+    current = dict(pairs)
+    for value, priority in decreases:
+        # heapq has no decrease-key: push a duplicate, skip stale ones on pop.
+        current[value] = priority
+        heapq.heappush(heap, (priority, value))
+    popped = 0
+    while heap:
+        priority, value = heapq.heappop(heap)
+        if current.get(value) == priority:
+            del current[value]
+            popped += 1
+    return popped
+
+
+def _priority_queue_run(pairs, decreases, arity):
+    queue = data_structures.PriorityQueue(arity=arity)
+    handles = queue.push_many(pairs)
+    for value, priority in decreases:
+        queue.decrease_key(handles[value], priority)
+    return len(queue.pop_many(len(queue)))
+
+
+def bench_priority_queue(size: int) -> None:
+    """
+    Compare PriorityQueue arities against heapq with lazy deletion on size
+    pushes, size / 2 decrease-keys and popping everything.
+    """
+    rng = random.Random(0)
+    pairs = [(value, rng.random()) for value in range(size)]
+    decreases = [
+        (value, pairs[value][1] / 2) for value in rng.sample(range(size), size // 2)
+    ]
+    candidates = [("heapq (lazy deletion)", lambda: _heapq_run(pairs, decreases))]
+    for arity in (2, 4, 8):
+        candidates.append(
+            (
+                f"PriorityQueue(arity={arity})",
+                lambda arity=arity: _priority_queue_run(pairs, decreases, arity),
+            )
+        )
+    print(f"{'structure':<28}{'events/s':>14}")
+    for name, run in candidates:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28}{(2 * size + size // 2) / elapsed:>14,.0f}")
+
+
+# Asymptotic regression suite. Every case names its expected growth per
+# call; "path" is O(log n) except where the structure degenerates on that
+# input (an unbalanced tree fed sorted keys), where it is O(n).
+
+_COMPLEXITY_EXPONENTS = {"1": 0.0, "log n": 0.0, "n": 1.0, "n log n": 1.0}
+_INPUTS = ("random", "sorted", "adversarial")
+_SUITE_MIN_TIME = 0.01
+
+
+def _index(structure, probe):
+    return min(probe // 2, len(structure) - 1)
+
+
+def _drain(iterable):
+    deque(iterable, maxlen=0)
+
+
+def _array_operations(mutable):
+    operations = [
+        ("get", lambda a, p: a.get(_index(a, p)), "1"),
+        (
+            "get_many(100)",
+            lambda a, p: a.get_many(range(_index(a, p) // 2, _index(a, p) // 2 + 100)),
+            "1",
+        ),
+        ("searchsorted", lambda a, p: a.searchsorted(p), "log n"),
+        ("iterate", lambda a, p: _drain(a), "n"),
+        ("reduce(add)", lambda a, p: a.reduce(operator.add), "n"),
+        ("map", lambda a, p: a.map(abs), "n"),
+        ("argsort", lambda a, p: a.argsort(), "n log n"),
+    ]
+    if not mutable:
+        operations.append(("set", lambda a, p: a.set(_index(a, p), p), "1"))
+    else:
+        operations += [
+            ("setitem", lambda a, p: a.__setitem__(_index(a, p), p), "1"),
+            (
+                "append+delete(last)",
+                lambda a, p: (a.append(p), a.delete(len(a) - 1)),
+                "1",
+            ),
+            ("extend(100)+delete(last)", lambda a, p: _extend_and_trim(a), "1"),
+            (
+                "insert+delete(index)",
+                lambda a, p: (a.insert(_index(a, p), p), a.delete(_index(a, p))),
+                "n",
+            ),
+        ]
+    # fill() overwrites the contents, so it runs last.
+    operations.append(("fill", lambda a, p: a.fill(p), "n"))
+    return operations
+
+
+def _rotate(linked_list):
+    value = linked_list.head.value
+    linked_list.delete(value)
+    linked_list.append(value)
+
+
+def _reverse_twice(linked_list):
+    linked_list.reverse()
+    linked_list.reverse()
+
+
+def _rotate_batch(linked_list):
+    values = list(itertools.islice(linked_list, 100))
+    for value in values:
+        linked_list.delete(value)
+    linked_list.extend(values)
+
+
+def _extend_and_trim(array):
+    array.extend(range(100))
+    for _ in range(100):
+        array.delete(len(array) - 1)
+
+
+def _insert_many_and_delete(tree, probe):
+    batch = range(probe + 1, probe + 21, 2)
+    tree.insert_many(batch)
+    for value in batch:
+        tree.delete(value)
+
+
+def _list_operations(doubly, indexed=False):
+    lookup = "1" if indexed else "n"
+    operations = [
+        ("append+delete(head)", lambda s, p: _rotate(s), "1"),
+        (
+            "appendleft+delete(head)",
+            lambda s, p: (s.appendleft(p + 1), s.delete(p + 1)),
+            "1",
+        ),
+        (
+            "insert+delete(position)",
+            lambda s, p: (s.insert(_index(s, p), p + 1), s.delete(p + 1)),
+            "n",
+        ),
+        ("find", lambda s, p: s.find(p), lookup),
+        ("size", lambda s, p: s.size(), "1"),
+        ("get_head", lambda s, p: s.get_head(), "1"),
+        ("get_tail", lambda s, p: s.get_tail(), "1"),
+        ("iterate", lambda s, p: _drain(s), "n"),
+        ("reverse", lambda s, p: _reverse_twice(s), "n"),
+    ]
+    if not doubly:
+        operations.append(
+            ("delete(head)+extend(100)", lambda s, p: _rotate_batch(s), "1")
+        )
+    if doubly:
+        operations += [
+            (
+                "insert_after+remove_node",
+                lambda s, p: s.remove_node(s.insert_after(s.head, p + 1)),
+                "1",
+            ),
+            (
+                "move_to_front+move_node_to_back",
+                lambda s, p: (s.move_to_front(p & ~1), s.move_node_to_back(s.head)),
+                lookup,
+            ),
+        ]
+    return operations
+
+
+_QUEUE_OPERATIONS = [
+    ("enqueue+dequeue", lambda q, p: (q.enqueue(p), q.dequeue()), "1"),
+    (
+        "enqueue_many+dequeue_many(100)",
+        lambda q, p: (q.enqueue_many(range(100)), q.dequeue_many(100)),
+        "1",
+    ),
+    ("peek", lambda q, p: q.peek(), "1"),
+    ("size", lambda q, p: q.size(), "1"),
+]
+
+_PRIORITY_QUEUE_OPERATIONS = [
+    ("push+pop", lambda q, p: (q.push(p, p), q.pop()), "log n"),
+    ("push+remove", lambda q, p: q.remove(q.push(p + 1, p + 1)), "log n"),
+    (
+        "push+decrease_key+pop",
+        lambda q, p: (q.decrease_key(q.push(p, p + 1), -1), q.pop()),
+        "log n",
+    ),
+    (
+        "push_many+pop_many(100)",
+        lambda q, p: (q.push_many((p, p) for _ in range(100)), q.pop_many(100)),
+        "log n",
+    ),
+    ("peek", lambda q, p: q.peek(), "1"),
+    ("size", lambda q, p: q.size(), "1"),
+]
+
+_TREE_OPERATIONS = [
+    ("insert+delete", lambda t, p: (t.insert(p + 1), t.delete(p + 1)), "path"),
+    ("search", lambda t, p: t.search(p), "path"),
+    ("rank", lambda t, p: t.rank(p), "path"),
+    ("select", lambda t, p: t.select(min(p // 2, t.size() - 1)), "path"),
+    ("count_range", lambda t, p: t.count_range(p, p + 200), "path"),
+    ("floor", lambda t, p: t.floor(p + 1), "path"),
+    ("ceiling", lambda t, p: t.ceiling(p + 1), "path"),
+    ("predecessor", lambda t, p: t.predecessor(p), "path"),
+    ("successor", lambda t, p: t.successor(p), "path"),
+    ("minimum", lambda t, p: t.minimum(), "path"),
+    ("maximum", lambda t, p: t.maximum(), "path"),
+    ("range", lambda t, p: _drain(t.range(p, p + 200)), "path"),
+    ("size", lambda t, p: t.size(), "1"),
+    ("height", lambda t, p: t.height(), "1"),
+    ("iter_inorder", lambda t, p: _drain(t.iter_inorder()), "n"),
+    ("iter_preorder", lambda t, p: _drain(t.iter_preorder()), "n"),
+    ("iter_postorder", lambda t, p: _drain(t.iter_postorder()), "n"),
+    ("iter_level_order", lambda t, p: _drain(t.iter_level_order()), "n"),
+    ("is_valid_bst", lambda t, p: t.is_valid_bst(), "n"),
+    ("from_sorted", lambda t, p: type(t).from_sorted(t.iter_inorder()), "n"),
+    # insert_many rebuilds a degenerate tree balanced, so it runs last.
+    ("insert_many(10)+delete", _insert_many_and_delete, "path"),
+]
+
+
+def _build_static(dtype):
+    def build(values):
+        static_array = data_structures.StaticArray(len(values), dtype=dtype)
+        static_array.set_many(range(len(values)), values)
+        return static_array
+
+    return build
+
+
+def _build_by(factory, method):
+    def build(values):
+        structure = factory()
+        add = getattr(structure, method)
+        for value in values:
+            add(value)
+        return structure
+
+    return build
+
+
+# (name, build, operations, inputs on which "path" degenerates to O(n),
+#  largest size to run those inputs at)
+SUITE = [
+    ("StaticArray", _build_static(None), _array_operations(False), (), None),
+    ("StaticArray(i8)", _build_static("i8"), _array_operations(False), (), None),
+    (
+        "DynamicArray",
+        _build_by(data_structures.DynamicArray, "append"),
+        _array_operations(True),
+        (),
+        None,
+    ),
+    (
+        "DynamicArray(i8)",
+        _build_by(lambda: data_structures.DynamicArray(dtype="i8"), "append"),
+        _array_operations(True),
+        (),
+        None,
+    ),
+    (
+        "SinglyLinkedList",
+        _build_by(data_structures.SinglyLinkedList, "append"),
+        _list_operations(False),
+        (),
+        None,
+    ),
+    (
+        "DoublyLinkedList",
+        _build_by(data_structures.DoublyLinkedList, "append"),
+        _list_operations(True),
+        (),
+        None,
+    ),
+    (
+        "DoublyLinkedList(indexed)",
+        _build_by(lambda: data_structures.DoublyLinkedList(indexed=True), "append"),
+        _list_operations(True, indexed=True),
+        (),
+        None,
+    ),
+    ("Queue", _build_by(data_structures.Queue, "enqueue"), _QUEUE_OPERATIONS, (), None),
+    (
+        "PriorityQueue",
+        lambda values: data_structures.PriorityQueue.heapify(
+            (value, value) for value in values
+        ),
+        _PRIORITY_QUEUE_OPERATIONS,
+        (),
+        None,
+    ),
+    (
+        "BinarySearchTree",
+        _build_by(data_structures.BinarySearchTree, "insert"),
+        _TREE_OPERATIONS,
+        ("sorted", "adversarial"),
+        1_000,
+    ),
+    (
+        "BinarySearchTree(balanced)",
+        _build_by(lambda: data_structures.BinarySearchTree(balanced=True), "insert"),
+        _TREE_OPERATIONS,
+        (),
+        None,
+    ),
+]
+
+
+def _suite_input(kind, size, rng):
+    """
+    Return (values, probes). Values are the even numbers 0..2n-2, so p + 1
+    is always absent and p // 2 is a valid index. Adversarial input is
+    sorted and every probe targets the far end: the last index, the tail
+    of a list and the deepest key of a degenerate tree.
+    """
+    values = list(range(0, 2 * size, 2))
+    if kind == "random":
+        rng.shuffle(values)
+    if kind == "adversarial":
+        return values, [2 * size - 1]
+    return values, rng.choices(values, k=1000)
+
+
+def _traced_build(build, values):
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = build(values)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, peak, elapsed
+
+
+def _seconds_per_call(operation, structure, probes):
+    """
+    Time operation(structure, probe) over the cycled probes the way timeit
+    does: with the collector off, doubling the number of calls until a run
+    takes at least _SUITE_MIN_TIME, then keeping the best of five runs.
+    """
+    calls = 1
+    gc.disable()
+    try:
+        while True:
+            batch = list(itertools.islice(itertools.cycle(probes), calls))
+            timings = []
+            for _ in range(5):
+                start = time.perf_counter()
+                for probe in batch:
+                    operation(structure, probe)
+                timings.append(time.perf_counter() - start)
+                if timings[0] < _SUITE_MIN_TIME:
+                    break
+            if timings[0] >= _SUITE_MIN_TIME:
+                return min(timings) / calls
+            calls *= 2
+    finally:
+        gc.enable()
+
+
+# Fewer sizes let one noisy timing decide the slope, so no exponent is fitted.
+_MIN_FIT_POINTS = 3
+
+
+def _fit_exponent(points):
+    """
+    Least-squares slope of log(seconds per call) against log(size), or None
+    with fewer than _MIN_FIT_POINTS sizes.
+    """
+    if len(points) < _MIN_FIT_POINTS:
+        return None
+    xs = [math.log(point["size"]) for point in points]
+    ys = [math.log(1 / point["ops_per_sec"]) for point in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return numerator / denominator
+
+
+def _suite_sizes(max_size):
+    sizes = [10**k for k in range(3, 8) if 10**k <= max_size]
+    return sizes or [max_size]
+
+
+def _degenerate_sizes(sizes, limit):
+    # Building a degenerate tree is quadratic, so these runs use a tenth of
+    # the sizes, up to the structure's limit, in half-decade steps so that
+    # there are still enough points to fit an exponent.
+    low = max(sizes[0] // 10, 1)
+    high = min(sizes[-1] // 10, limit)
+    case_sizes = []
+    step = 0
+    while round(low * 10 ** (step / 2)) <= high:
+        case_sizes.append(round(low * 10 ** (step / 2)))
+        step += 1
+    return case_sizes
+
+
+def run_suite(max_size, tolerance=0.5):
+    """
+    Time every suite operation on every input at sizes 10^3..max_size and
+    return the report dict.
+    """
+    rng = random.Random(0)
+    sizes = _suite_sizes(max_size)
+    builds = []
+    cases = {}
+    for name, build, operations, degenerate, degenerate_limit in SUITE:
+        for kind in _INPUTS:
+            case_sizes = sizes
+            if kind in degenerate:
+                case_sizes = _degenerate_sizes(sizes, degenerate_limit)
+            for size in case_sizes:
+                values, probes = _suite_input(kind, size, rng)
+                structure, peak, elapsed = _traced_build(build, values)
+                builds.append(
+                    {
+                        "structure": name,
+                        "input": kind,
+                        "size": size,
+                        "peak_bytes": peak,
+                        "bytes_per_element": peak / size,
+                        "build_seconds": elapsed,
+                    }
+                )
+                for operation_name, operation, complexity in operations:
+                    if complexity == "path":
+                        complexity = "n" if kind in degenerate else "log n"
+                    case = cases.setdefault(
+                        (name, operation_name, kind),
+                        {
+                            "structure": name,
+                            "operation": operation_name,
+                            "input": kind,
+                            "complexity": complexity,
+                            "points": [],
+                        },
+                    )
+                    seconds = _seconds_per_call(operation, structure, probes)
+                    case["points"].append({"size": size, "ops_per_sec": 1 / seconds})
+                del structure
+                print(f"{name:<28}{kind:<13}{size:>10,}", file=sys.stderr)
+    results = list(cases.values())
+    for case in results:
+        case["exponent"] = _fit_exponent(case["points"])
+        case["expected_exponent"] = _COMPLEXITY_EXPONENTS[case["complexity"]]
+    report = {
+        "python": sys.version.split()[0],
+        "sizes": sizes,
+        "tolerance": tolerance,
+        "results": results,
+        "builds": builds,
+    }
+    report["failures"] = _check_complexity(report)
+    return report
+
+
+def _check_complexity(report):
+    failures = []
+    for case in report["results"]:
+        exponent = case["exponent"]
+        if (
+            exponent is not None
+            and exponent > case["expected_exponent"] + report["tolerance"]
+        ):
+            failures.append(
+                f"{case['structure']}.{case['operation']} ({case['input']}): scales as "
+                f"n^{exponent:.2f}, expected O({case['complexity']})"
+            )
+    return failures
+
+
+def compare_to_baseline(report, baseline, max_slowdown=3.0):
+    """
+    Return the cases that scale worse than in the baseline report by more
+    than the tolerance, or whose median throughput over the shared sizes
+    dropped by more than max_slowdown times.
+    """
+    previous = {
+        (case["structure"], case["operation"], case["input"]): case
+        for case in baseline["results"]
+    }
+    failures = []
+    for case in report["results"]:
+        old = previous.get((case["structure"], case["operation"], case["input"]))
+        if old is None:
+            continue
+        label = f"{case['structure']}.{case['operation']} ({case['input']})"
+        if (
+            case["exponent"] is not None
+            and old["exponent"] is not None
+            and case["exponent"] > old["exponent"] + report["tolerance"]
+        ):
+            failures.append(
+                f"{label}: exponent {case['exponent']:.2f}, "
+                f"baseline {old['exponent']:.2f}"
+            )
+        old_rates = {point["size"]: point["ops_per_sec"] for point in old["points"]}
+        ratios = sorted(
+            old_rates[point["size"]] / point["ops_per_sec"]
+            for point in case["points"]
+            if point["size"] in old_rates
+        )
+        if ratios and ratios[len(ratios) // 2] > max_slowdown:
+            failures.append(
+                f"{label}: {ratios[len(ratios) // 2]:.1f}x slower than baseline"
+            )
+    return failures
+
+
+def bench_suite(args) -> int:
+    """
+    Run the regression suite, write the JSON report and return the exit
+    status: 1 when an operation scales worse than its declared complexity
+    or regresses against --baseline.
+    """
+    report = run_suite(args.size, args.tolerance)
+    if args.baseline:
+        with open(args.baseline) as fileobj:
+            report["failures"] += compare_to_baseline(
+                report, json.load(fileobj), args.max_slowdown
+            )
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as fileobj:
+            fileobj.write(text + "\n")
+    for failure in report["failures"]:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if report["failures"] else 0
+
+
+BENCHMARKS = {
+    "btree": bench_btree,
+    "concurrent_queue": bench_concurrent_queue,
+    "shared_memory_queue": bench_shared_memory_queue,
+    "linked_list_memory": bench_linked_list_memory,
+    "skip_list": bench_skip_list,
+    "priority_queue": bench_priority_queue,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["suite"])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--output", default="-", help="suite: JSON report path")
+    parser.add_argument(
+        "--baseline", help="suite: earlier JSON report to compare against"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="suite: allowed exponent increase"
+    )
+    parser.add_argument(
+        "--max-slowdown", type=float, default=3.0, help="suite: allowed throughput drop"
+    )
+    args = parser.parse_args()
+    if args.benchmark == "suite":
+        sys.exit(bench_suite(args))
+    BENCHMARKS[args.benchmark](args.size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,369 @@
+import asyncio
+import copy
+import functools
+import heapq
+import inspect
+import io
+import itertools
+import json
+import mmap
+import multiprocessing
+import operator
+import os
+import pickle
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from multiprocessing import shared_memory
 from typing import List, Any, Dict, Set, Generator
 
+# NumPy-style dtype names accepted wherever a typed buffer is used, mapped to
+# array module typecodes.
+_DTYPES = {
+    "i1": "b",
+    "u1": "B",
+    "i2": "h",
+    "u2": "H",
+    "i4": "i",
+    "u4": "I",
+    "i8": "q",
+    "u8": "Q",
+    "f4": "f",
+    "f8": "d",
+}
 
-class StaticArray:
-    def __init__(self, capacity: int):
+
+# Header of StaticArray.open_mmap files: magic, version, typecode, capacity.
+_MMAP_HEADER = struct.Struct("<4sBc2xQ")
+_MMAP_MAGIC = b"SARR"
+_MMAP_VERSION = 1
+
+
+# Reductions with a builtin C loop, used by the bulk reduce(). sum starts
+# from 0, so it only stands in for operator.add on typed (numeric) storage.
+_REDUCERS = {operator.add: sum, min: min, max: max}
+
+# Default for optional arguments where None is a meaningful value.
+_MISSING = object()
+
+# Separates positional from keyword arguments in memoize keys.
+_KWARGS_MARK = object()
+
+
+# Snapshot framing: magic, version, little-endian flag, type name size,
+# metadata size and section count; each section has kind, typecode, size.
+_SNAPSHOT_HEADER = struct.Struct("<4sB?BIB")
+_SECTION_HEADER = struct.Struct("<ccQ")
+_SNAPSHOT_MAGIC = b"DSNP"
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_TYPES = {}
+
+
+def _typecode(dtype: str) -> str:
+    typecode = _DTYPES.get(dtype, dtype)
+    if typecode not in _DTYPES.values():
+        raise ValueError(f"unsupported dtype: {dtype!r}")
+    return typecode
+
+
+class _BulkOps:
+    """
+    Batch operations shared by StaticArray and DynamicArray. They check
+    bounds once per batch and loop over self.array directly (in C where the
+    builtins allow) instead of making one get/set call per value.
+    """
+
+    def get_many(self, indices) -> List[int]:
+        """
+        Retrieve the values at several indices.
+        """
+        indices = list(indices)
+        self._check_indices(indices)
+        if len(indices) < 2:
+            return [self.array[index] for index in indices]
+        return list(operator.itemgetter(*indices)(self.array))
+
+    def set_many(self, indices, values) -> None:
+        """
+        Set the values at several indices.
+        """
+        indices = list(indices)
+        values = list(values)
+        if len(indices) != len(values):
+            raise ValueError("indices and values must have the same length")
+        self._check_indices(indices)
+        storage = self.array
+        for index, value in zip(indices, values):
+            storage[index] = value
+
+    def fill(self, value: int, start: int = 0, stop: int = None) -> None:
+        """
+        Set every value in [start, stop) to value.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self.array))
+        self.array[start:stop] = self._storage([value]) * max(0, stop - start)
+
+    def map(self, func, dtype: str = None):
+        """
+        Returns a new array of func applied to every value, typed as dtype
+        (the same dtype as this array by default).
+        """
+        if dtype is None:
+            dtype = self.dtype
+        values = map(func, self.array)
+        storage = list(values) if dtype is None else array(_typecode(dtype), values)
+        return self._wrap(storage, dtype)
+
+    def reduce(self, func, initial: Any = _MISSING) -> Any:
+        """
+        Fold the values with func, like functools.reduce. min, max and, on
+        typed arrays, operator.add use the builtin min/max/sum loops.
+        """
+        fast = _REDUCERS.get(func)
+        if fast is sum and self.dtype is None:
+            fast = None
+        if fast is not None and len(self.array):
+            result = fast(self.array)
+            return result if initial is _MISSING else func(initial, result)
+        if initial is _MISSING:
+            return functools.reduce(func, self.array)
+        return functools.reduce(func, self.array, initial)
+
+    def argsort(self) -> List[int]:
+        """
+        Returns the indices that would sort the array.
+        """
+        return sorted(range(len(self.array)), key=self.array.__getitem__)
+
+    def searchsorted(self, value: int, side: str = "left") -> int:
+        """
+        Returns the index at which value would be inserted to keep a sorted
+        array sorted (before equal values for side="left", after for "right").
+        """
+        if side == "left":
+            return bisect_left(self.array, value)
+        if side == "right":
+            return bisect_right(self.array, value)
+        raise ValueError("side must be 'left' or 'right'")
+
+    def _storage(self, values):
+        if self.dtype is None:
+            return list(values)
+        return array(_typecode(self.dtype), values)
+
+    def _check_indices(self, indices):
+        if indices and (min(indices) < 0 or max(indices) >= len(self.array)):
+            raise IndexError
+
+
+class _Snapshot:
+    """
+    Versioned binary snapshots shared by the containers. A subclass provides
+    _snapshot() -> (meta, sections) and the classmethod _restore(meta,
+    sections); sections are typed arrays written as raw bytes, or lists that
+    are stored as int64/float64 arrays when possible and pickled otherwise.
+    """
+
+    def dump(self, fileobj) -> None:
+        """
+        Write a binary snapshot of the structure to a binary file object.
+        Values that are not all ints or all floats are pickled.
+        """
+        meta, sections = self._snapshot()
+        name = self.__class__.__name__.encode()
+        meta = json.dumps(meta).encode()
+        fileobj.write(
+            _SNAPSHOT_HEADER.pack(
+                _SNAPSHOT_MAGIC,
+                _SNAPSHOT_VERSION,
+                sys.byteorder == "little",
+                len(name),
+                len(meta),
+                len(sections),
+            )
+        )
+        fileobj.write(name)
+        fileobj.write(meta)
+        for values in sections:
+            _write_section(fileobj, values)
+
+    @classmethod
+    def load(cls, fileobj):
+        """
+        Read a structure written by dump() from a binary file object.
+        Pickled sections are unpickled, which can run arbitrary code: only
+        load snapshots from trusted sources.
+        """
+        result = _read_snapshot(fileobj)
+        if not isinstance(result, cls):
+            raise ValueError(f"snapshot holds a {type(result).__name__}")
+        return result
+
+    def __reduce_ex__(self, protocol):
+        snapshot = io.BytesIO()
+        self.dump(snapshot)
+        if protocol >= 5:
+            # Lets pickle.dumps(..., buffer_callback=...) ship it out-of-band.
+            return _load_snapshot, (pickle.PickleBuffer(snapshot.getbuffer()),)
+        return _load_snapshot, (snapshot.getvalue(),)
+
+    def __copy__(self):
+        # Keep copy.copy() shallow instead of going through __reduce_ex__.
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        return clone
+
+    def __deepcopy__(self, memo):
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        clone.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        return clone
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _SNAPSHOT_TYPES[cls.__name__] = cls
+
+
+def _write_section(fileobj, values):
+    if not isinstance(values, array):
+        kinds = set(map(type, values))
+        try:
+            if kinds <= {int}:
+                values = array("q", values)
+            elif kinds == {float}:
+                values = array("d", values)
+        except OverflowError:
+            pass
+    if isinstance(values, array):
+        data = memoryview(values).cast("B")
+        fileobj.write(_SECTION_HEADER.pack(b"a", values.typecode.encode(), len(data)))
+    else:
+        data = pickle.dumps(list(values), protocol=5)
+        fileobj.write(_SECTION_HEADER.pack(b"p", b"-", len(data)))
+    fileobj.write(data)
+
+
+def _read_exact(fileobj, size):
+    data = fileobj.read(size)
+    if len(data) != size:
+        raise ValueError("truncated snapshot")
+    return data
+
+
+def _read_snapshot(fileobj):
+    magic, version, little, name_size, meta_size, count = _SNAPSHOT_HEADER.unpack(
+        _read_exact(fileobj, _SNAPSHOT_HEADER.size)
+    )
+    if magic != _SNAPSHOT_MAGIC:
+        raise ValueError("not a data_structures snapshot")
+    if version != _SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    name = _read_exact(fileobj, name_size).decode()
+    meta = json.loads(_read_exact(fileobj, meta_size))
+    sections = []
+    for it in range(count):
+        kind, typecode, size = _SECTION_HEADER.unpack(
+            _read_exact(fileobj, _SECTION_HEADER.size)
+        )
+        data = _read_exact(fileobj, size)
+        if kind == b"a":
+            values = array(typecode.decode())
+            values.frombytes(data)
+            if little != (sys.byteorder == "little"):
+                values.byteswap()
+        else:
+            values = pickle.loads(data)
+        sections.append(values)
+    if name not in _SNAPSHOT_TYPES:
+        raise ValueError(f"unknown snapshot type {name}")
+    return _SNAPSHOT_TYPES[name]._restore(meta, sections)
+
+
+def _load_snapshot(data):
+    return _read_snapshot(io.BytesIO(data))
+
+
+def _even_chunks(total, limit):
+    """
+    Split range(total) into the fewest (start, stop) chunks of at most limit
+    items, with sizes differing by at most one.
+    """
+    chunks = -(-total // limit)
+    bounds = [total * i // chunks for i in range(chunks + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+class _MemoryUsage:
+    """
+    Mixin adding memory_usage(). Subclasses implement _footprint(deep),
+    returning (container, nodes, payload, elements) with sizes in bytes.
+    """
+
+    def memory_usage(self, deep: bool = True) -> Dict[str, Any]:
+        """
+        Returns the bytes held by the structure, split into container, nodes
+        and payload (unboxed typed values, plus the referenced value objects
+        when deep=True).
+        """
+        container, nodes, payload, elements = self._footprint(deep)
+        overhead = container + nodes
+        return {
+            "total": overhead + payload,
+            "container": container,
+            "nodes": nodes,
+            "payload": payload,
+            "elements": elements,
+            "overhead_per_element": overhead / elements if elements else 0.0,
+            "payload_per_element": payload / elements if elements else 0.0,
+        }
+
+
+def _object_size(obj):
+    # The object plus its instance dict.
+    return sys.getsizeof(obj) + sys.getsizeof(vars(obj))
+
+
+def _values_size(values):
+    return sum(sys.getsizeof(value) for value in values if value is not None)
+
+
+def _storage_size(storage, count, deep):
+    """
+    Split a list, array or typed memoryview holding count live values into
+    (container bytes, payload bytes).
+    """
+    if isinstance(storage, list):
+        return sys.getsizeof(storage), _values_size(storage) if deep else 0
+    payload = count * storage.itemsize
+    total = sys.getsizeof(storage)
+    if isinstance(storage, memoryview):
+        owner = storage.obj
+        total += sys.getsizeof(owner) if isinstance(owner, array) else storage.nbytes
+    return total - payload, payload
+
+
+class StaticArray(_BulkOps, _Snapshot, _MemoryUsage):
+    def __init__(self, capacity: int, dtype: str = None):
         """
         Initialize a static array of a given capacity.
+
+        With a dtype such as "i8" or "f4" the values are stored unboxed in a
+        single contiguous buffer, exported without copying by buffer().
         """
-        self.array = [None] * capacity
         self.capacity = capacity
+        self.dtype = dtype
+        self.mmap = None
+        if dtype is None:
+            self.array = [None] * capacity
+        else:
+            typecode = _typecode(dtype)
+            storage = array(typecode, bytes(capacity * array(typecode).itemsize))
+            self.array = memoryview(storage)
 
     def set(self, index: int, value: int) -> None:
         """
@@ -27,13 +383,189 @@ class StaticArray:
         else:
             raise IndexError
 
+    @classmethod
+    def open_mmap(
+        cls,
+        path: str,
+        capacity: int = None,
+        dtype: str = None,
+        readonly: bool = False,
+    ) -> "StaticArray":
+        """
+        Open a typed array stored in a memory-mapped file, creating it when
+        the file does not exist (capacity and dtype are then required).
+
+        The file starts with a small header recording the dtype and
+        capacity. Pages load lazily, so opening is O(1) in the array size,
+        and writes are shared with every process mapping the same file.
+        """
+        if not os.path.exists(path):
+            if readonly or capacity is None or dtype is None:
+                raise FileNotFoundError(path)
+            typecode = _typecode(dtype)
+            with open(path, "wb") as file:
+                file.write(
+                    _MMAP_HEADER.pack(
+                        _MMAP_MAGIC, _MMAP_VERSION, typecode.encode(), capacity
+                    )
+                )
+                file.truncate(_MMAP_HEADER.size + capacity * array(typecode).itemsize)
+
+        with open(path, "rb" if readonly else "r+b") as file:
+            mapping = mmap.mmap(
+                file.fileno(),
+                0,
+                access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE,
+            )
+        if len(mapping) < _MMAP_HEADER.size:
+            mapping.close()
+            raise ValueError(f"{path} is not a StaticArray file")
+        magic, version, typecode, stored_capacity = _MMAP_HEADER.unpack_from(mapping)
+        typecode = typecode.decode()
+        if (
+            magic != _MMAP_MAGIC
+            or version != _MMAP_VERSION
+            or typecode not in _DTYPES.values()
+        ):
+            mapping.close()
+            raise ValueError(f"{path} is not a StaticArray file")
+        expected = _MMAP_HEADER.size + stored_capacity * array(typecode).itemsize
+        if len(mapping) != expected:
+            mapping.close()
+            raise ValueError(f"{path} is truncated or has trailing data")
+        if (capacity is not None and capacity != stored_capacity) or (
+            dtype is not None and _typecode(dtype) != typecode
+        ):
+            mapping.close()
+            raise ValueError(f"{path} does not match the requested capacity/dtype")
+
+        static_array = cls.__new__(cls)
+        static_array.capacity = stored_capacity
+        static_array.dtype = dtype or next(
+            name for name, code in _DTYPES.items() if code == typecode
+        )
+        static_array.mmap = mapping
+        static_array.array = memoryview(mapping)[_MMAP_HEADER.size :].cast(typecode)
+        return static_array
+
+    def flush(self) -> None:
+        """
+        Write changes of a memory-mapped array back to its file.
+        """
+        if self.mmap is not None:
+            self.mmap.flush()
+
+    def close(self) -> None:
+        """
+        Release the storage of a memory-mapped array and unmap its file.
+        Slice views and buffer() exports must be released first; otherwise
+        BufferError is raised and the array stays open.
+        """
+        if self.mmap is None:
+            return
+        typecode = self.array.format
+        self.array.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            self.array = memoryview(self.mmap)[_MMAP_HEADER.size :].cast(typecode)
+            raise BufferError("release slice views and buffer() exports before close()")
+        self.mmap = None
+
+    def buffer(self) -> memoryview:
+        """
+        Returns a zero-copy memoryview of a typed array's storage, suitable
+        for numpy.frombuffer or C extensions.
+        """
+        if self.dtype is None:
+            raise TypeError("only typed arrays expose a buffer")
+        return self.array[:]
+
+    def __buffer__(self, flags):
+        return self.buffer()
+
+    def __len__(self):
+        return self.capacity
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self.array[index])
+        return self.get(index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = self._storage(value)
+            if len(values) != len(range(*index.indices(self.capacity))):
+                raise ValueError("slice assignment cannot change a StaticArray's size")
+            self.array[index] = values
+        else:
+            self.set(index, value)
 
-class DynamicArray:
-    def __init__(self):
+    def _wrap(self, storage, dtype):
+        result = self._view(storage if dtype is None else memoryview(storage))
+        result.dtype = dtype
+        return result
+
+    def _view(self, storage):
+        """
+        Wrap a slice of the storage in a new StaticArray. Slices of typed
+        arrays are views sharing memory with this one; untyped slices are
+        copies.
+        """
+        view = self.__class__.__new__(self.__class__)
+        view.capacity = len(storage)
+        view.dtype = self.dtype
+        view.mmap = None
+        view.array = storage
+        return view
+
+    def _snapshot(self):
+        if self.dtype is None:
+            values = self.array
+        else:
+            values = array(_typecode(self.dtype), self.array.tobytes())
+        return {"capacity": self.capacity, "dtype": self.dtype}, [values]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        static_array = cls(meta["capacity"], meta["dtype"])
+        values = sections[0]
+        if static_array.dtype is None:
+            static_array.array = list(values)
+        else:
+            static_array.array = memoryview(values)
+        return static_array
+
+    def __deepcopy__(self, memo):
+        # A memoryview cannot be deep-copied; rebuild from a snapshot.
+        clone = self._restore(*copy.deepcopy(self._snapshot(), memo))
+        memo[id(self)] = clone
+        return clone
+
+    def _footprint(self, deep):
+        container, payload = _storage_size(self.array, self.capacity, deep)
+        return _object_size(self) + container, 0, payload, self.capacity
+
+
+class DynamicArray(_BulkOps, _Snapshot, _MemoryUsage):
+    def __init__(self, dtype: str = None):
         """
         Initialize an empty dynamic array.
+
+        With a dtype such as "i8" or "f4" the values are stored unboxed in a
+        growable array.array.
         """
-        self.array = []
+        self.dtype = dtype
+        self.array = [] if dtype is None else array(_typecode(dtype))
+
+    def extend(self, iterable) -> None:
+        """
+        Add all values from an iterable to the end of the dynamic array.
+        """
+        self.array.extend(iterable)
 
     def append(self, value: int) -> None:
         """
@@ -68,8 +600,210 @@ class DynamicArray:
         else:
             raise IndexError
 
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        return iter(self.array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._wrap(self.array[index], self.dtype)
+        return self.get(index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.array[index] = self._storage(value)
+        elif 0 <= index < len(self.array):
+            self.array[index] = value
+        else:
+            raise IndexError
+
+    def _wrap(self, storage, dtype):
+        result = self.__class__(dtype)
+        result.array = storage
+        return result
+
+    def _snapshot(self):
+        return {"dtype": self.dtype}, [self.array]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        dynamic_array = cls(meta["dtype"])
+        dynamic_array.extend(sections[0])
+        return dynamic_array
+
+    def _footprint(self, deep):
+        container, payload = _storage_size(self.array, len(self.array), deep)
+        return _object_size(self) + container, 0, payload, len(self.array)
+
+
+class BlockedDynamicArray(_Snapshot, _MemoryUsage):
+    def __init__(self, load: int = 4096):
+        """
+        Initialize an empty blocked dynamic array.
+
+        Values live in a list of blocks of roughly load values, with a prefix
+        index of block offsets. A positional insert or delete shifts at most
+        O(load) values and rebuilds the O(n / load) offsets in one C-level
+        pass, instead of shifting all n values as DynamicArray does.
+        """
+        if load < 1:
+            raise ValueError("load must be positive")
+        self.block_load = load
+        self.blocks = []
+        self.offsets = [0]
+        self.count = 0
+
+    def append(self, value: int) -> None:
+        """
+        Add a value to the end of the array.
+        """
+        if not self.blocks or len(self.blocks[-1]) >= self.block_load:
+            self.blocks.append([value])
+            self.offsets.append(self.offsets[-1] + 1)
+        else:
+            self.blocks[-1].append(value)
+            self.offsets[-1] += 1
+        self.count += 1
+
+    def extend(self, iterable) -> None:
+        """
+        Add all values from an iterable to the end of the array.
+        """
+        values = list(iterable)
+        if self.blocks and len(self.blocks[-1]) < self.block_load:
+            room = self.block_load - len(self.blocks[-1])
+            self.blocks[-1].extend(values[:room])
+            values = values[room:]
+        for start in range(0, len(values), self.block_load):
+            self.blocks.append(values[start : start + self.block_load])
+        self._reindex()
+
+    def insert(self, index: int, value: int) -> None:
+        """
+        Insert a value at a particular index.
+        """
+        if index == self.count:
+            self.append(value)
+            return
+        block_index, offset = self._locate(index)
+        block = self.blocks[block_index]
+        block.insert(offset, value)
+        if len(block) > 2 * self.block_load:
+            self.blocks[block_index : block_index + 1] = self._chunk(block)
+        self._reindex()
+
+    def splice(self, index: int, iterable) -> None:
+        """
+        Insert all values from an iterable starting at a particular index.
+        """
+        if index == self.count:
+            self.extend(iterable)
+            return
+        block_index, offset = self._locate(index)
+        block = self.blocks[block_index]
+        merged = block[:offset] + list(iterable) + block[offset:]
+        self.blocks[block_index : block_index + 1] = self._chunk(merged)
+        self._reindex()
+
+    def delete(self, index: int) -> None:
+        """
+        Delete the value at a particular index.
+        """
+        block_index, offset = self._locate(index)
+        block = self.blocks[block_index]
+        del block[offset]
+        if len(block) < max(1, self.block_load // 2) and len(self.blocks) > 1:
+            # Fold the shrunken (or, with load=1, empty) block into a
+            # neighbour to bound the block count.
+            if block_index + 1 == len(self.blocks):
+                block_index -= 1
+            merged = self.blocks[block_index] + self.blocks[block_index + 1]
+            self.blocks[block_index : block_index + 2] = self._chunk(merged)
+        self._reindex()
+
+    def delete_range(self, start: int, stop: int) -> None:
+        """
+        Delete the values at indices start <= i < stop.
+        """
+        if not 0 <= start <= stop <= self.count:
+            raise IndexError
+        if start == stop:
+            return
+        first, first_offset = self._locate(start)
+        if stop == self.count:
+            last, last_offset = len(self.blocks) - 1, len(self.blocks[-1])
+        else:
+            last, last_offset = self._locate(stop)
+        merged = self.blocks[first][:first_offset] + self.blocks[last][last_offset:]
+        if 0 < len(merged) < self.block_load // 2 and last + 1 < len(self.blocks):
+            merged += self.blocks[last + 1]
+            last += 1
+        self.blocks[first : last + 1] = self._chunk(merged)
+        self._reindex()
+
+    def get(self, index: int) -> int:
+        """
+        Retrieve the value at a particular index.
+        """
+        block_index, offset = self._locate(index)
+        return self.blocks[block_index][offset]
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the array.
+        """
+        return self.count
+
+    def is_empty(self) -> bool:
+        """
+        Checks if the array is empty.
+        """
+        return self.count == 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.blocks)
+
+    def _locate(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError
+        block_index = bisect_right(self.offsets, index) - 1
+        return block_index, index - self.offsets[block_index]
+
+    def _chunk(self, values):
+        if len(values) <= 2 * self.block_load:
+            return [values] if values else []
+        load = self.block_load
+        return [values[i : i + load] for i in range(0, len(values), load)]
+
+    def _reindex(self):
+        self.offsets = list(itertools.accumulate(map(len, self.blocks), initial=0))
+        self.count = self.offsets[-1]
+
+    def _snapshot(self):
+        return {"load": self.block_load}, [list(self)]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        blocked_array = cls(meta["load"])
+        blocked_array.extend(sections[0])
+        return blocked_array
+
+    def _footprint(self, deep):
+        container = _object_size(self) + sys.getsizeof(self.blocks)
+        container += sys.getsizeof(self.offsets)
+        container += sum(map(sys.getsizeof, self.blocks))
+        payload = sum(map(_values_size, self.blocks)) if deep else 0
+        return container, 0, payload, self.count
+
 
 class Node:
+    __slots__ = ("value", "next")
+
     def __init__(self, value: int):
         """
         Initialize a node.
@@ -78,12 +812,14 @@ class Node:
         self.next = None
 
 
-class SinglyLinkedList:
+class SinglyLinkedList(_Snapshot, _MemoryUsage):
     def __init__(self):
         """
         Initialize an empty singly linked list.
         """
         self.head = None
+        self.tail = None
+        self.count = 0
 
     def append(self, value: int) -> None:
         """
@@ -92,25 +828,65 @@ class SinglyLinkedList:
         node_to_add = Node(value)
         if self.head is None:
             self.head = node_to_add
+        else:
+            self.tail.next = node_to_add
+        self.tail = node_to_add
+        self.count += 1
+
+    def appendleft(self, value: int) -> None:
+        """
+        Add a node with a value to the front of the linked list.
+        """
+        node_to_add = Node(value)
+        node_to_add.next = self.head
+        self.head = node_to_add
+        if self.tail is None:
+            self.tail = node_to_add
+        self.count += 1
+
+    def extend(self, iterable) -> None:
+        """
+        Add nodes for all values of an iterable to the end of the linked list.
+        The new chain is built first and then linked in a single step.
+        """
+        first = last = None
+        added = 0
+        for value in iterable:
+            node_to_add = Node(value)
+            if first is None:
+                first = node_to_add
+            else:
+                last.next = node_to_add
+            last = node_to_add
+            added += 1
+        if first is None:
             return
-        last_node = self.head
-        while last_node.next is not None:
-            last_node = last_node.next
-        last_node.next = node_to_add
+        if self.head is None:
+            self.head = first
+        else:
+            self.tail.next = first
+        self.tail = last
+        self.count += added
 
     def insert(self, position: int, value: int) -> None:
         """
         Insert a node with a value at a particular position.
         """
-        node_to_add = Node(value)
         if position == 0:
-            self.head = node_to_add
+            self.appendleft(value)
+            return
+        if not 0 < position <= self.count:
+            raise IndexError
+        if position == self.count:
+            self.append(value)
             return
+        node_to_add = Node(value)
         last_node = self.head
         for it in range(position - 1):
             last_node = last_node.next
         node_to_add.next = last_node.next
         last_node.next = node_to_add
+        self.count += 1
 
     def delete(self, value: int) -> None:
         """
@@ -121,10 +897,16 @@ class SinglyLinkedList:
             return
         if self.head.value == value:
             self.head = self.head.next
+            if self.head is None:
+                self.tail = None
+            self.count -= 1
             return
         while node_to_remove.next is not None:
             if node_to_remove.next.value == value:
+                if node_to_remove.next is self.tail:
+                    self.tail = node_to_remove
                 node_to_remove.next = node_to_remove.next.next
+                self.count -= 1
                 return
             node_to_remove = node_to_remove.next
 
@@ -133,26 +915,17 @@ class SinglyLinkedList:
         Find a node with a specific value.
         """
         node_to_find = self.head
-        if self.head is None:
-            return None
-        if self.head.value == value:
-            return self.head
         while node_to_find is not None:
-            node_to_find = node_to_find.next
             if node_to_find.value == value:
                 return node_to_find
+            node_to_find = node_to_find.next
         return None
 
     def size(self) -> int:
         """
         Returns the number of elements in the linked list.
         """
-        last_node = self.head
-        counter = 0
-        while last_node is not None:
-            last_node = last_node.next
-            counter += 1
-        return counter
+        return self.count
 
     def is_empty(self) -> bool:
         """
@@ -175,6 +948,7 @@ class SinglyLinkedList:
         """
         prev = None
         current = self.head
+        self.tail = current
         while current is not None:
             next_node = current.next
             current.next = prev
@@ -192,13 +966,35 @@ class SinglyLinkedList:
         """
         Returns the tail node of the linked list.
         """
-        tail = self.head
-        while tail.next is not None:
-            tail = tail.next
-        return tail
+        return self.tail
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        node = self.head
+        while node is not None:
+            yield node.value
+            node = node.next
+
+    def _snapshot(self):
+        return {}, [list(self)]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        linked_list = cls()
+        linked_list.extend(sections[0])
+        return linked_list
+
+    def _footprint(self, deep):
+        nodes = self.count * sys.getsizeof(self.head) if self.head is not None else 0
+        payload = _values_size(self) if deep else 0
+        return _object_size(self), nodes, payload, self.count
 
 
 class DoubleNode:
+    __slots__ = ("value", "next", "prev")
+
     def __init__(self, value: int, next_node=None, prev_node=None):
         """
         Initialize a double node with value, next, and previous.
@@ -208,105 +1004,182 @@ class DoubleNode:
         self.prev = prev_node
 
 
-class DoublyLinkedList:
-    def __init__(self):
+class DoublyLinkedList(_Snapshot, _MemoryUsage):
+    def __init__(self, indexed: bool = False):
         """
         Initialize an empty doubly linked list.
+
+        With indexed=True the list also keeps a map from each value to its
+        nodes, making find, delete and the move operations O(1) for unique
+        values. Values must then be hashable; a duplicated value is found by
+        scanning for the first of its nodes in list order, as without the
+        index.
         """
         self.head = None
         self.tail = None
+        self.count = 0
+        self.index = {} if indexed else None
+
+    def _link(self, node, prev_node, next_node):
+        node.prev = prev_node
+        node.next = next_node
+        if prev_node is None:
+            self.head = node
+        else:
+            prev_node.next = node
+        if next_node is None:
+            self.tail = node
+        else:
+            next_node.prev = node
+
+    def _unlink(self, node):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = node.next = None
+
+    def _add(self, value, prev_node, next_node):
+        node_to_add = DoubleNode(value)
+        self._link(node_to_add, prev_node, next_node)
+        self.count += 1
+        if self.index is not None:
+            self.index.setdefault(value, {})[node_to_add] = None
+        return node_to_add
 
     def append(self, value: int) -> None:
         """
         Add a node with a value to the end of the linked list.
         """
-        node_to_add = DoubleNode(value)
-        if self.head is None:
-            self.head = node_to_add
-            self.tail = node_to_add
-            return
-        self.tail.next = node_to_add
-        node_to_add.prev = self.tail
-        self.tail = node_to_add
+        self._add(value, self.tail, None)
+
+    def appendleft(self, value: int) -> None:
+        """
+        Add a node with a value to the front of the linked list.
+        """
+        self._add(value, None, self.head)
 
     def insert(self, position: int, value: int) -> None:
         """
         Insert a node with a value at a particular position.
         """
-        node_to_add = DoubleNode(value)
-        if position == 0:
-            if self.head is not None:
-                node_to_add.next = self.head
-                self.head.prev = node_to_add
-            else:
-                self.tail = node_to_add
-            self.head = node_to_add
-        else:
-            current = self.head
-            for it in range(position - 1):
-                if current is None:
-                    raise IndexError
-                current = current.next
-            node_to_add.next = current.next
-            node_to_add.prev = current
-            if current.next is not None:
-                current.next.prev = node_to_add
-            else:
-                self.tail = node_to_add
-            current.next = node_to_add
+        if not 0 <= position <= self.count:
+            raise IndexError
+        current = None
+        for it in range(position):
+            current = self.head if current is None else current.next
+        self._add(value, current, self.head if current is None else current.next)
+
+    def insert_after(self, node: DoubleNode, value: int) -> DoubleNode:
+        """
+        Insert a value right after a node of this list and return its node.
+        """
+        return self._add(value, node, node.next)
+
+    def insert_before(self, node: DoubleNode, value: int) -> DoubleNode:
+        """
+        Insert a value right before a node of this list and return its node.
+        """
+        return self._add(value, node.prev, node)
+
+    def remove_node(self, node: DoubleNode) -> None:
+        """
+        Remove a node of this list in O(1).
+        """
+        self._unlink(node)
+        self.count -= 1
+        if self.index is not None:
+            nodes = self.index[node.value]
+            del nodes[node]
+            if not nodes:
+                del self.index[node.value]
 
     def delete(self, value: int) -> None:
         """
         Delete the first node with a specific value.
         """
-        node_to_remove = self.head
-        if node_to_remove is None:
-            return
+        node_to_remove = self.find(value)
+        if node_to_remove is not None:
+            self.remove_node(node_to_remove)
 
-        if node_to_remove.value == value:
-            self.head = node_to_remove.next
-            if self.head:
-                self.head.prev = None
-            else:
-                self.tail = None
-            return
+    def move_node_to_front(self, node: DoubleNode) -> None:
+        """
+        Move a node of this list to the front in O(1).
+        """
+        if node is not self.head:
+            self._unlink(node)
+            self._link(node, None, self.head)
 
-        while node_to_remove.next:
-            if node_to_remove.next.value == value:
-                next_node = node_to_remove.next.next
-                node_to_remove.next = next_node
-                if next_node:
-                    next_node.prev = node_to_remove
-                else:
-                    self.tail = node_to_remove
-                return
-            node_to_remove = node_to_remove.next
+    def move_node_to_back(self, node: DoubleNode) -> None:
+        """
+        Move a node of this list to the back in O(1).
+        """
+        if node is not self.tail:
+            self._unlink(node)
+            self._link(node, self.tail, None)
+
+    def move_to_front(self, value: int) -> None:
+        """
+        Move the first node with a specific value to the front.
+        """
+        node = self.find(value)
+        if node is None:
+            raise KeyError(value)
+        self.move_node_to_front(node)
+
+    def move_to_back(self, value: int) -> None:
+        """
+        Move the first node with a specific value to the back.
+        """
+        node = self.find(value)
+        if node is None:
+            raise KeyError(value)
+        self.move_node_to_back(node)
 
     def find(self, value: int) -> DoubleNode:
         """
         Find a node with a specific value.
         """
+        if self.index is not None:
+            nodes = self.index.get(value)
+            if not nodes:
+                return None
+            if len(nodes) == 1:
+                return next(iter(nodes))
+            node_to_find = self.head
+            while node_to_find not in nodes:
+                node_to_find = node_to_find.next
+            return node_to_find
         node_to_find = self.head
-        if self.head is None:
-            return None
-        if self.head.value == value:
-            return self.head
         while node_to_find is not None:
-            node_to_find = node_to_find.next
             if node_to_find.value == value:
                 return node_to_find
+            node_to_find = node_to_find.next
         return None
 
+    def __contains__(self, value):
+        if self.index is not None:
+            return value in self.index
+        return self.find(value) is not None
+
     def size(self) -> int:
         """
         Returns the number of elements in the linked list.
         """
-        last_node = self.head
-        counter = 0
-        while last_node is not None:
-            last_node = last_node.next
-            counter += 1
-        return counter
+        return self.count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        node = self.head
+        while node is not None:
+            yield node.value
+            node = node.next
 
     def is_empty(self) -> bool:
         """
@@ -346,44 +1219,1363 @@ class DoublyLinkedList:
         """
         return self.tail
 
+    def _snapshot(self):
+        return {"indexed": self.index is not None}, [list(self)]
 
-class Queue:
-    def __init__(self):
-        """
-        Initialize an empty queue.
-        """
-        self.queue = []
+    @classmethod
+    def _restore(cls, meta, sections):
+        linked_list = cls(meta["indexed"])
+        for value in sections[0]:
+            linked_list.append(value)
+        return linked_list
+
+    def _footprint(self, deep):
+        container = _object_size(self)
+        if self.index is not None:
+            container += sys.getsizeof(self.index)
+            container += sum(map(sys.getsizeof, self.index.values()))
+        nodes = self.count * sys.getsizeof(self.head) if self.head is not None else 0
+        payload = _values_size(self) if deep else 0
+        return container, nodes, payload, self.count
+
+
+class _CacheEntry:
+    __slots__ = ("node", "value", "nbytes", "expires", "frequency")
+
+    def __init__(self, value, nbytes, expires):
+        """
+        Initialize the bookkeeping of one cached value.
+        """
+        self.node = None
+        self.value = value
+        self.nbytes = nbytes
+        self.expires = expires
+        self.frequency = 1
+
+
+class Cache(_MemoryUsage):
+    def __init__(
+        self,
+        capacity: int = None,
+        max_bytes: int = None,
+        policy: str = "lru",
+        ttl: float = None,
+        sizeof=sys.getsizeof,
+    ):
+        """
+        Initialize an empty cache with O(1) get and put.
+
+        Once it holds capacity entries, or the sizeof estimates of its values
+        reach max_bytes, the cache evicts the least recently used entry
+        (policy="lru") or the least frequently used one, oldest first among
+        ties (policy="lfu"). Entries expire ttl seconds after their last put.
+        Recency order is kept in DoublyLinkedLists of keys, one per use count
+        under LFU.
+        """
+        if policy not in ("lru", "lfu"):
+            raise ValueError("policy must be 'lru' or 'lfu'")
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be positive")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be positive")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.entries = {}
+        self.buckets = {}
+        self.min_frequency = 1
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """
+        Returns the value cached for key, or default on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            self._remove(key, entry)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._touch(entry)
+        return entry.value
+
+    def put(self, key: Any, value: Any) -> None:
+        """
+        Cache a value for key, evicting other entries as needed. A value
+        larger than max_bytes on its own is not cached.
+        """
+        nbytes = self.sizeof(value) if self.max_bytes is not None else 0
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._remove(key, entry)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        while self.entries and (
+            (self.capacity is not None and len(self.entries) >= self.capacity)
+            or (self.max_bytes is not None and self.nbytes + nbytes > self.max_bytes)
+        ):
+            self._evict()
+        new_entry = _CacheEntry(value, nbytes, expires)
+        if entry is not None:
+            new_entry.frequency = entry.frequency
+        self.entries[key] = new_entry
+        self.nbytes += nbytes
+        self._link(key, new_entry)
+
+    def delete(self, key: Any) -> None:
+        """
+        Remove key from the cache if present.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._remove(key, entry)
+
+    def purge_expired(self) -> int:
+        """
+        Remove every expired entry and return how many were removed.
+        """
+        now = time.monotonic()
+        expired = [
+            key
+            for key, entry in self.entries.items()
+            if entry.expires is not None and entry.expires <= now
+        ]
+        for key in expired:
+            self._remove(key, self.entries[key])
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        """
+        Remove every entry, keeping the counters.
+        """
+        self.entries.clear()
+        self.buckets.clear()
+        self.min_frequency = 1
+        self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit, miss, eviction and expiration counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.nbytes,
+        }
+
+    def __contains__(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and (
+            entry.expires is None or entry.expires > time.monotonic()
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _bucket(self, frequency):
+        if self.policy == "lru":
+            frequency = 1
+        bucket = self.buckets.get(frequency)
+        if bucket is None:
+            bucket = self.buckets[frequency] = DoublyLinkedList()
+        return bucket
+
+    def _link(self, key, entry):
+        bucket = self._bucket(entry.frequency)
+        bucket.append(key)
+        entry.node = bucket.tail
+        if entry.frequency < self.min_frequency or len(self.entries) == 1:
+            self.min_frequency = entry.frequency
+
+    def _unlink(self, entry):
+        frequency = entry.frequency if self.policy == "lfu" else 1
+        bucket = self.buckets[frequency]
+        bucket.remove_node(entry.node)
+        if bucket.is_empty() and self.policy == "lfu":
+            del self.buckets[frequency]
+
+    def _touch(self, entry):
+        if self.policy == "lru":
+            self.buckets[1].move_node_to_back(entry.node)
+            return
+        frequency = entry.frequency
+        self._unlink(entry)
+        if frequency == self.min_frequency and frequency not in self.buckets:
+            self.min_frequency = frequency + 1
+        entry.frequency = frequency + 1
+        bucket = self._bucket(entry.frequency)
+        bucket.append(entry.node.value)
+        entry.node = bucket.tail
+
+    def _remove(self, key, entry):
+        self._unlink(entry)
+        del self.entries[key]
+        self.nbytes -= entry.nbytes
+
+    def _evict(self):
+        if self.policy == "lru":
+            bucket = self.buckets[1]
+        else:
+            if self.min_frequency not in self.buckets:
+                # Only after delete/expiry emptied the lowest bucket.
+                self.min_frequency = min(self.buckets)
+            bucket = self.buckets[self.min_frequency]
+        key = bucket.head.value
+        self._remove(key, self.entries[key])
+        self.evictions += 1
+
+    def _footprint(self, deep):
+        container = _object_size(self) + sys.getsizeof(self.entries)
+        container += sys.getsizeof(self.buckets)
+        container += sum(map(_object_size, self.buckets.values()))
+        nodes = 0
+        if self.entries:
+            entry = next(iter(self.entries.values()))
+            nodes = len(self.entries) * (
+                sys.getsizeof(entry) + sys.getsizeof(entry.node)
+            )
+        payload = 0
+        if deep:
+            payload = _values_size(self.entries)
+            payload += _values_size(entry.value for entry in self.entries.values())
+        return container, nodes, payload, len(self.entries)
+
+
+def memoize(capacity: int = 128, **options):
+    """
+    Decorator caching a function's results in a Cache keyed by its
+    arguments. Extra keyword arguments configure the Cache; it is exposed as
+    the wrapper's cache attribute.
+    """
+
+    def decorator(func):
+        cache = Cache(capacity, **options)
+        missing = object()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args
+            if kwargs:
+                key += (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+            result = cache.get(key, missing)
+            if result is missing:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+class _CompactList(_Snapshot, _MemoryUsage):
+    """
+    Slot storage shared by the compact linked lists. Values and links live
+    in parallel arrays indexed by slot number, -1 is the null link, and
+    freed slots are recycled from a free stack. Elements are addressed by
+    their slot: find, get_head and get_tail return slots, value() reads one.
+    """
+
+    def __init__(self, dtype: str = None):
+        self.dtype = dtype
+        self.values = [] if dtype is None else array(_typecode(dtype))
+        self.next = array("q")
+        self.free = []
+        self.head = -1
+        self.tail = -1
+        self.count = 0
+
+    def _alloc(self, value):
+        if self.free:
+            slot = self.free.pop()
+            self.values[slot] = value
+            return slot
+        self.values.append(value)
+        self.next.append(-1)
+        return len(self.values) - 1
+
+    def _release(self, slot):
+        if self.dtype is None:
+            self.values[slot] = None
+        self.free.append(slot)
+        self.count -= 1
+
+    def value(self, slot: int) -> int:
+        """
+        Returns the value stored in a slot.
+        """
+        return self.values[slot]
+
+    def extend(self, iterable) -> None:
+        """
+        Add all values from an iterable to the end of the linked list.
+        """
+        for value in iterable:
+            self.append(value)
+
+    def find(self, value: int) -> int:
+        """
+        Find the slot of the first element with a specific value.
+        """
+        values, links = self.values, self.next
+        slot = self.head
+        while slot != -1:
+            if values[slot] == value:
+                return slot
+            slot = links[slot]
+        return None
+
+    def size(self) -> int:
+        """
+        Returns the number of elements in the linked list.
+        """
+        return self.count
+
+    def is_empty(self) -> bool:
+        """
+        Checks if the linked list is empty.
+        """
+        return self.count == 0
+
+    def get_head(self) -> int:
+        """
+        Returns the slot of the head element.
+        """
+        return None if self.head == -1 else self.head
+
+    def get_tail(self) -> int:
+        """
+        Returns the slot of the tail element.
+        """
+        return None if self.tail == -1 else self.tail
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        values, links = self.values, self.next
+        slot = self.head
+        while slot != -1:
+            yield values[slot]
+            slot = links[slot]
+
+    def _snapshot(self):
+        values = list(self)
+        if self.dtype is not None:
+            values = array(_typecode(self.dtype), values)
+        return {"dtype": self.dtype}, [values]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        linked_list = cls(meta["dtype"])
+        linked_list.extend(sections[0])
+        return linked_list
+
+    def _footprint(self, deep):
+        container, payload = _storage_size(self.values, self.count, deep)
+        container += (
+            _object_size(self) + sys.getsizeof(self.next) + sys.getsizeof(self.free)
+        )
+        if getattr(self, "prev", None) is not None:
+            container += sys.getsizeof(self.prev)
+        return container, 0, payload, self.count
+
+
+class CompactSinglyLinkedList(_CompactList):
+    def __init__(self, dtype: str = None):
+        """
+        Initialize an empty singly linked list stored in parallel arrays
+        rather than one Python object per node.
+        """
+        super().__init__(dtype)
+
+    def append(self, value: int) -> None:
+        """
+        Add an element with a value to the end of the linked list.
+        """
+        slot = self._alloc(value)
+        self.next[slot] = -1
+        if self.tail == -1:
+            self.head = slot
+        else:
+            self.next[self.tail] = slot
+        self.tail = slot
+        self.count += 1
+
+    def appendleft(self, value: int) -> None:
+        """
+        Add an element with a value to the front of the linked list.
+        """
+        slot = self._alloc(value)
+        self.next[slot] = self.head
+        self.head = slot
+        if self.tail == -1:
+            self.tail = slot
+        self.count += 1
+
+    def insert(self, position: int, value: int) -> None:
+        """
+        Insert an element with a value at a particular position.
+        """
+        if position == 0:
+            self.appendleft(value)
+            return
+        if not 0 < position <= self.count:
+            raise IndexError
+        if position == self.count:
+            self.append(value)
+            return
+        prev = self.head
+        for it in range(position - 1):
+            prev = self.next[prev]
+        slot = self._alloc(value)
+        self.next[slot] = self.next[prev]
+        self.next[prev] = slot
+        self.count += 1
+
+    def delete(self, value: int) -> None:
+        """
+        Delete the first element with a specific value.
+        """
+        prev = -1
+        slot = self.head
+        while slot != -1 and self.values[slot] != value:
+            prev = slot
+            slot = self.next[slot]
+        if slot == -1:
+            return
+        following = self.next[slot]
+        if prev == -1:
+            self.head = following
+        else:
+            self.next[prev] = following
+        if slot == self.tail:
+            self.tail = prev
+        self._release(slot)
+
+    def reverse(self) -> None:
+        """
+        Reverse the linked list in-place.
+        """
+        links = self.next
+        prev = -1
+        slot = self.head
+        self.tail = slot
+        while slot != -1:
+            following = links[slot]
+            links[slot] = prev
+            prev = slot
+            slot = following
+        self.head = prev
+
+
+class CompactDoublyLinkedList(_CompactList):
+    def __init__(self, dtype: str = None):
+        """
+        Initialize an empty doubly linked list stored in parallel arrays
+        rather than one Python object per node.
+        """
+        super().__init__(dtype)
+        self.prev = array("q")
+
+    def _alloc(self, value):
+        slot = super()._alloc(value)
+        if slot == len(self.prev):
+            self.prev.append(-1)
+        return slot
+
+    def _link_after(self, prev, slot):
+        following = self.head if prev == -1 else self.next[prev]
+        self.prev[slot] = prev
+        self.next[slot] = following
+        if prev == -1:
+            self.head = slot
+        else:
+            self.next[prev] = slot
+        if following == -1:
+            self.tail = slot
+        else:
+            self.prev[following] = slot
+        self.count += 1
+
+    def append(self, value: int) -> None:
+        """
+        Add an element with a value to the end of the linked list.
+        """
+        self._link_after(self.tail, self._alloc(value))
+
+    def appendleft(self, value: int) -> None:
+        """
+        Add an element with a value to the front of the linked list.
+        """
+        self._link_after(-1, self._alloc(value))
+
+    def insert(self, position: int, value: int) -> None:
+        """
+        Insert an element with a value at a particular position.
+        """
+        if not 0 <= position <= self.count:
+            raise IndexError
+        prev = -1
+        for it in range(position):
+            prev = self.head if prev == -1 else self.next[prev]
+        self._link_after(prev, self._alloc(value))
+
+    def delete(self, value: int) -> None:
+        """
+        Delete the first element with a specific value.
+        """
+        slot = self.find(value)
+        if slot is None:
+            return
+        prev, following = self.prev[slot], self.next[slot]
+        if prev == -1:
+            self.head = following
+        else:
+            self.next[prev] = following
+        if following == -1:
+            self.tail = prev
+        else:
+            self.prev[following] = prev
+        self._release(slot)
+
+    def reverse(self) -> None:
+        """
+        Reverse the linked list in O(1) by swapping the link arrays.
+        """
+        self.next, self.prev = self.prev, self.next
+        self.head, self.tail = self.tail, self.head
+
+
+class Queue(_Snapshot, _MemoryUsage):
+    def __init__(self, maxsize: int = 0, overwrite: bool = False):
+        """
+        Initialize an empty queue backed by a growable circular buffer.
+
+        With maxsize > 0 the queue holds at most maxsize values; enqueueing
+        onto a full queue raises IndexError, or drops the oldest value when
+        overwrite=True.
+        """
+        self.maxsize = maxsize
+        self.overwrite = overwrite
+        self.buffer = [None] * 8
+        self.head = 0
+        self.count = 0
 
     def enqueue(self, value: int) -> None:
         """
         Add a value to the end of the queue.
         """
-        self.queue.append(value)
+        if self.maxsize and self.count >= self.maxsize:
+            if not self.overwrite:
+                raise IndexError
+            self._drop(1)
+        if self.count == len(self.buffer):
+            self._resize(len(self.buffer) * 2)
+        self.buffer[(self.head + self.count) & (len(self.buffer) - 1)] = value
+        self.count += 1
+
+    def enqueue_many(self, iterable) -> None:
+        """
+        Add a batch of values to the end of the queue with bulk copies.
+        A batch that does not fit a bounded, non-overwriting queue is
+        rejected as a whole.
+        """
+        values = list(iterable)
+        if self.maxsize:
+            excess = self.count + len(values) - self.maxsize
+            if excess > 0:
+                if not self.overwrite:
+                    raise IndexError
+                if len(values) > self.maxsize:
+                    values = values[-self.maxsize :]
+                self._drop(min(excess, self.count))
+        needed = self.count + len(values)
+        if needed > len(self.buffer):
+            capacity = len(self.buffer)
+            while capacity < needed:
+                capacity *= 2
+            self._resize(capacity)
+        capacity = len(self.buffer)
+        tail = (self.head + self.count) & (capacity - 1)
+        first = min(len(values), capacity - tail)
+        self.buffer[tail : tail + first] = values[:first]
+        self.buffer[: len(values) - first] = values[first:]
+        self.count += len(values)
 
     def dequeue(self) -> int:
         """
         Remove a value from the front of the queue and return it.
         """
-        if self.is_empty():
+        if self.count == 0:
             raise IndexError
-        return self.queue.pop(0)
+        value = self.buffer[self.head]
+        self.buffer[self.head] = None
+        self.head = (self.head + 1) & (len(self.buffer) - 1)
+        self.count -= 1
+        if len(self.buffer) > 8 and self.count * 4 <= len(self.buffer):
+            self._resize(len(self.buffer) // 2)
+        return value
+
+    def dequeue_many(self, n: int) -> List[int]:
+        """
+        Remove up to n values from the front of the queue and return them
+        in order.
+        """
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        values = self._front(min(n, self.count))
+        self._drop(len(values))
+        return values
 
     def peek(self) -> int:
         """
         Peek at the value at the front of the queue without removing it.
         """
-        if self.is_empty():
+        if self.count == 0:
             raise IndexError
-        return self.queue[0]
+        return self.buffer[self.head]
+
+    def is_empty(self) -> bool:
+        """
+        Check if the queue is empty.
+        """
+        return self.count == 0
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the queue.
+        """
+        return self.count
+
+    def __len__(self):
+        return self.count
+
+    def _front(self, k):
+        first = self.buffer[self.head : self.head + k]
+        if len(first) < k:
+            first += self.buffer[: k - len(first)]
+        return first
+
+    def _drop(self, k):
+        capacity = len(self.buffer)
+        end = self.head + k
+        if end <= capacity:
+            self.buffer[self.head : end] = [None] * k
+        else:
+            self.buffer[self.head :] = [None] * (capacity - self.head)
+            self.buffer[: end - capacity] = [None] * (end - capacity)
+        self.head = end & (capacity - 1)
+        self.count -= k
+        if capacity > 8 and self.count * 4 <= capacity:
+            self._resize(max(8, capacity // 2))
+
+    def _resize(self, capacity):
+        values = self._front(self.count)
+        self.buffer = values + [None] * (capacity - self.count)
+        self.head = 0
+
+    def _snapshot(self):
+        meta = {"maxsize": self.maxsize, "overwrite": self.overwrite}
+        return meta, [self._front(self.count)]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        queue = cls(meta["maxsize"], meta["overwrite"])
+        queue.enqueue_many(sections[0])
+        return queue
+
+    def _footprint(self, deep):
+        payload = 0
+        if deep:
+            mask = len(self.buffer) - 1
+            payload = _values_size(
+                self.buffer[(self.head + i) & mask] for i in range(self.count)
+            )
+        return _object_size(self) + sys.getsizeof(self.buffer), 0, payload, self.count
+
+
+class QueueClosed(Exception):
+    """
+    Raised when putting to a closed ConcurrentQueue, or getting from one
+    that is closed and drained.
+    """
+
+
+class ConcurrentQueue(_MemoryUsage):
+    def __init__(self, maxsize: int = 0):
+        """
+        Initialize an empty thread-safe queue on top of the Queue ring buffer.
+
+        Producers block in put while a bounded queue is full and consumers
+        block in get while it is empty; both wake on a condition variable
+        instead of polling.
+        """
+        self.queue = Queue()
+        self.maxsize = maxsize
+        self.closed = False
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+    def _has_room(self):
+        return self.closed or not self.maxsize or self.queue.count < self.maxsize
+
+    def _has_items(self):
+        return self.closed or self.queue.count > 0
+
+    def put(self, value: int, timeout: float = None) -> None:
+        """
+        Add a value to the end of the queue, waiting up to timeout seconds
+        (forever if None) for room. Raises TimeoutError or QueueClosed.
+        """
+        with self.not_full:
+            if not self.not_full.wait_for(self._has_room, timeout):
+                raise TimeoutError
+            if self.closed:
+                raise QueueClosed
+            self.queue.enqueue(value)
+            self.not_empty.notify()
+
+    def put_many(self, iterable, timeout: float = None) -> None:
+        """
+        Add a batch of values, handing them over as room becomes available.
+        The batch is not atomic: on TimeoutError or QueueClosed, the
+        exception's enqueued attribute holds how many values went in.
+        """
+        values = list(iterable)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.not_full:
+            start = 0
+            while start < len(values):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not self.not_full.wait_for(self._has_room, remaining):
+                    error = TimeoutError()
+                    error.enqueued = start
+                    raise error
+                if self.closed:
+                    error = QueueClosed()
+                    error.enqueued = start
+                    raise error
+                room = len(values) - start
+                if self.maxsize:
+                    room = min(room, self.maxsize - self.queue.count)
+                self.queue.enqueue_many(values[start : start + room])
+                start += room
+                self.not_empty.notify(room)
+
+    def get(self, timeout: float = None) -> int:
+        """
+        Remove and return the value at the front of the queue, waiting up to
+        timeout seconds (forever if None). Raises TimeoutError, or
+        QueueClosed once the queue is closed and drained.
+        """
+        with self.not_empty:
+            if not self.not_empty.wait_for(self._has_items, timeout):
+                raise TimeoutError
+            if self.queue.count == 0:
+                raise QueueClosed
+            value = self.queue.dequeue()
+            self.not_full.notify()
+            return value
+
+    def get_many(self, max_items: int, timeout: float = None) -> List[int]:
+        """
+        Wait like get for at least one value, then remove and return up to
+        max_items values in a single wakeup.
+        """
+        if max_items < 0:
+            raise ValueError("max_items must be non-negative")
+        with self.not_empty:
+            if not self.not_empty.wait_for(self._has_items, timeout):
+                raise TimeoutError
+            if self.queue.count == 0:
+                raise QueueClosed
+            values = self.queue.dequeue_many(max_items)
+            self.not_full.notify(len(values))
+            if self.queue.count:
+                self.not_empty.notify()
+            return values
+
+    def close(self) -> None:
+        """
+        Close the queue: further puts fail, blocked callers wake up, and
+        consumers can still drain the remaining values.
+        """
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
 
     def is_empty(self) -> bool:
         """
         Check if the queue is empty.
         """
-        return len(self.queue) == 0
+        return self.queue.count == 0
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the queue.
+        """
+        return self.queue.count
+
+    def __len__(self):
+        return self.queue.count
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except QueueClosed:
+                return
+
+    def _footprint(self, deep):
+        with self.lock:
+            container, nodes, payload, elements = self.queue._footprint(deep)
+        return container + _object_size(self), nodes, payload, elements
+
+
+class AsyncQueue(_MemoryUsage):
+    def __init__(self, high_watermark: int = 0, low_watermark: int = None):
+        """
+        Initialize an empty asyncio queue on top of the Queue ring buffer.
+
+        With high_watermark > 0, producers are paused once the queue holds
+        high_watermark values and resume when consumers have drained it down
+        to low_watermark (half the high watermark by default).
+        """
+        self.queue = Queue()
+        self.high_watermark = high_watermark
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+        self.low_watermark = low_watermark
+        self.paused = False
+        self.closed = False
+        self._getters = deque()
+        self._putters = deque()
+
+    async def put(self, value: int) -> None:
+        """
+        Add a value to the end of the queue, waiting while producers are paused.
+        """
+        await self._wait_for_room()
+        self.queue.enqueue(value)
+        self._after_put()
+
+    async def put_many(self, iterable) -> None:
+        """
+        Add a batch of values to the end of the queue.
+        """
+        await self._wait_for_room()
+        self.queue.enqueue_many(iterable)
+        self._after_put()
+
+    async def get(self) -> int:
+        """
+        Remove and return the value at the front of the queue, waiting while
+        it is empty. Raises QueueClosed once the queue is closed and drained.
+        """
+        await self._wait_for_items()
+        value = self.queue.dequeue()
+        self._after_get()
+        return value
+
+    async def get_many(self, max_items: int) -> List[int]:
+        """
+        Wait like get for at least one value, then remove and return up to
+        max_items values.
+        """
+        if max_items < 0:
+            raise ValueError("max_items must be non-negative")
+        await self._wait_for_items()
+        values = self.queue.dequeue_many(max_items)
+        self._after_get()
+        return values
+
+    def close(self) -> None:
+        """
+        Close the queue: further puts fail with QueueClosed, waiters wake up,
+        and consumers can still drain the remaining values.
+        """
+        self.closed = True
+        self._wake_all(self._getters)
+        self._wake_all(self._putters)
+
+    def is_empty(self) -> bool:
+        """
+        Check if the queue is empty.
+        """
+        return self.queue.count == 0
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the queue.
+        """
+        return self.queue.count
+
+    def __len__(self):
+        return self.queue.count
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.get()
+        except QueueClosed:
+            raise StopAsyncIteration
+
+    async def _wait_for_room(self):
+        while self.paused and not self.closed:
+            await self._wait(self._putters, lambda: not self.paused)
+        if self.closed:
+            raise QueueClosed
+
+    async def _wait_for_items(self):
+        while self.queue.count == 0:
+            if self.closed:
+                raise QueueClosed
+            await self._wait(self._getters, lambda: self.queue.count)
+
+    async def _wait(self, waiters, ready):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # A cancelled waiter may already have been woken; pass the
+            # wakeup on so it is not lost, as asyncio.Queue does.
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if ready():
+                self._wake_one(waiters)
+            raise
+
+    def _after_put(self):
+        if self.high_watermark and self.queue.count >= self.high_watermark:
+            self.paused = True
+        self._wake_one(self._getters)
+
+    def _after_get(self):
+        if self.queue.count:
+            self._wake_one(self._getters)
+        if self.paused and self.queue.count <= self.low_watermark:
+            self.paused = False
+            self._wake_all(self._putters)
+
+    @staticmethod
+    def _wake_one(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    @staticmethod
+    def _wake_all(waiters):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _footprint(self, deep):
+        container, nodes, payload, elements = self.queue._footprint(deep)
+        container += _object_size(self)
+        container += sys.getsizeof(self._getters) + sys.getsizeof(self._putters)
+        return container, nodes, payload, elements
+
+
+class SharedMemoryQueue(_MemoryUsage):
+    def __init__(self, capacity: int, dtype: str = "i8", name: str = None, lock=None):
+        """
+        Initialize a fixed-capacity queue of typed numbers that lives in a
+        multiprocessing.shared_memory segment.
+
+        Without name a new segment (and lock) is created. Other processes
+        attach by passing the segment name and the creator's lock, or simply
+        receive the queue as a Process argument or Pool initializer argument.
+        Values are copied straight into the shared buffer without pickling.
+        """
+        if name is not None and lock is None:
+            raise ValueError("attaching to an existing queue requires its lock")
+        self.dtype = dtype
+        self.typecode = _typecode(dtype)
+        self.capacity = capacity
+        data_bytes = capacity * array(self.typecode).itemsize
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=name is None, size=16 + data_bytes
+        )
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        self.header = self.shm.buf[:16].cast("q")
+        self.data = self.shm.buf[16 : 16 + data_bytes].cast(self.typecode)
+        if name is None:
+            self.header[0] = 0
+            self.header[1] = 0
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.capacity, self.dtype, self.shm.name, self.lock),
+        )
+
+    def enqueue(self, value: int) -> None:
+        """
+        Add a value to the end of the queue. Raises IndexError when full.
+        """
+        with self.lock:
+            head, count = self.header
+            if count == self.capacity:
+                raise IndexError
+            self.data[(head + count) % self.capacity] = value
+            self.header[1] = count + 1
+
+    def enqueue_many(self, values) -> None:
+        """
+        Add a batch of values with at most two buffer copies. A batch that
+        does not fit is rejected as a whole with IndexError.
+        """
+        if not (isinstance(values, array) and values.typecode == self.typecode):
+            values = array(self.typecode, values)
+        batch = memoryview(values)
+        with self.lock:
+            head, count = self.header
+            if count + len(batch) > self.capacity:
+                raise IndexError
+            tail = (head + count) % self.capacity
+            first = min(len(batch), self.capacity - tail)
+            self.data[tail : tail + first] = batch[:first]
+            self.data[: len(batch) - first] = batch[first:]
+            self.header[1] = count + len(batch)
+
+    def dequeue(self) -> int:
+        """
+        Remove a value from the front of the queue and return it.
+        """
+        with self.lock:
+            head, count = self.header
+            if count == 0:
+                raise IndexError
+            value = self.data[head]
+            self.header[0] = (head + 1) % self.capacity
+            self.header[1] = count - 1
+            return value
+
+    def dequeue_many(self, n: int) -> array:
+        """
+        Remove up to n values from the front of the queue and return them
+        as a typed array.
+        """
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        batch = array(self.typecode)
+        with self.lock:
+            head, count = self.header
+            k = min(n, count)
+            first = min(k, self.capacity - head)
+            batch.frombytes(self.data[head : head + first].cast("B"))
+            batch.frombytes(self.data[: k - first].cast("B"))
+            self.header[0] = (head + k) % self.capacity
+            self.header[1] = count - k
+        return batch
+
+    def peek(self) -> int:
+        """
+        Peek at the value at the front of the queue without removing it.
+        """
+        with self.lock:
+            head, count = self.header
+            if count == 0:
+                raise IndexError
+            return self.data[head]
+
+    def is_empty(self) -> bool:
+        """
+        Check if the queue is empty.
+        """
+        return self.header[1] == 0
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the queue.
+        """
+        return self.header[1]
+
+    def __len__(self):
+        return self.header[1]
+
+    def close(self) -> None:
+        """
+        Detach this process from the shared segment.
+        """
+        self.header.release()
+        self.data.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """
+        Destroy the shared segment; call once, from the creating process.
+        """
+        self.shm.unlink()
+
+    def _footprint(self, deep):
+        count = self.size()
+        payload = count * self.data.itemsize
+        return _object_size(self) + self.shm.size - payload, 0, payload, count
+
+
+class PriorityHandle:
+    __slots__ = ("index",)
+
+    def __init__(self, index: int):
+        """
+        Initialize a handle to an entry of a PriorityQueue; index tracks the
+        entry's heap position and is -1 once it has left the queue.
+        """
+        self.index = index
+
+
+class PriorityQueue(_Snapshot, _MemoryUsage):
+    def __init__(self, arity: int = 8, dtype: str = None):
+        """
+        Initialize an empty min-priority queue.
+
+        Entries live in a d-ary heap (arity children per node) kept in
+        parallel contiguous arrays of priorities, values and handles; with a
+        dtype such as "f8" the priorities are stored unboxed in an
+        array.array. A wider heap is shallower, so pushes and decrease_key
+        do fewer moves while pops compare more children per level. Order
+        among equal priorities is unspecified.
+        """
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self.arity = arity
+        self.dtype = dtype
+        self.priorities = [] if dtype is None else array(_typecode(dtype))
+        self.values = []
+        self.handles = []
+
+    @classmethod
+    def heapify(cls, iterable, arity: int = 8, dtype: str = None) -> "PriorityQueue":
+        """
+        Build a queue from (value, priority) pairs in O(n).
+        """
+        queue = cls(arity, dtype)
+        queue.push_many(iterable)
+        return queue
+
+    def push(self, value: Any, priority) -> PriorityHandle:
+        """
+        Add a value with a priority in O(log n) and return its handle.
+        """
+        handle = PriorityHandle(len(self.values))
+        self.priorities.append(priority)
+        self.values.append(value)
+        self.handles.append(handle)
+        self._sift_up(handle.index)
+        return handle
+
+    def push_many(self, iterable) -> List[PriorityHandle]:
+        """
+        Add (value, priority) pairs and return their handles. A batch at
+        least as large as the queue is appended and heapified in O(n + k)
+        instead of being sifted in one by one. A malformed pair leaves the
+        queue unchanged.
+        """
+        start = len(self.values)
+        values, priorities = [], []
+        for value, priority in iterable:
+            values.append(value)
+            priorities.append(priority)
+        if self.dtype is not None:
+            priorities = array(self.priorities.typecode, priorities)
+        handles = [PriorityHandle(start + offset) for offset in range(len(values))]
+        self.priorities.extend(priorities)
+        self.values.extend(values)
+        self.handles.extend(handles)
+        if len(handles) >= start:
+            for index in range((len(self.values) - 2) // self.arity, -1, -1):
+                self._sift_down(index)
+        else:
+            for index in range(start, len(self.values)):
+                self._sift_up(index)
+        return handles
+
+    def pop(self) -> Any:
+        """
+        Remove and return the value with the smallest priority.
+        """
+        if not self.values:
+            raise IndexError
+        return self._remove_at(0)
+
+    def pop_many(self, n: int) -> List[Any]:
+        """
+        Remove and return up to n values in priority order.
+        """
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        remove_at = self._remove_at
+        return [remove_at(0) for _ in range(min(n, len(self.values)))]
+
+    def peek(self) -> Any:
+        """
+        Returns the value with the smallest priority without removing it.
+        """
+        if not self.values:
+            raise IndexError
+        return self.values[0]
+
+    def peek_priority(self):
+        """
+        Returns the smallest priority in the queue.
+        """
+        if not self.values:
+            raise IndexError
+        return self.priorities[0]
+
+    def priority(self, handle: PriorityHandle):
+        """
+        Returns the current priority of a handle's entry.
+        """
+        return self.priorities[self._position(handle)]
+
+    def decrease_key(self, handle: PriorityHandle, priority) -> None:
+        """
+        Lower the priority of a handle's entry in O(log n).
+        """
+        index = self._position(handle)
+        if priority > self.priorities[index]:
+            raise ValueError("decrease_key() cannot raise a priority")
+        self.priorities[index] = priority
+        self._sift_up(index)
+
+    def remove(self, handle: PriorityHandle) -> Any:
+        """
+        Remove a handle's entry in O(log n) and return its value.
+        """
+        return self._remove_at(self._position(handle))
+
+    def __contains__(self, handle):
+        index = handle.index
+        return 0 <= index < len(self.handles) and self.handles[index] is handle
+
+    def is_empty(self) -> bool:
+        """
+        Check if the priority queue is empty.
+        """
+        return not self.values
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the priority queue.
+        """
+        return len(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def _position(self, handle):
+        if handle not in self:
+            raise KeyError("handle is not in this queue")
+        return handle.index
+
+    def _remove_at(self, index):
+        priorities, values, handles = self.priorities, self.values, self.handles
+        value = values[index]
+        handles[index].index = -1
+        priority = priorities.pop()
+        last_value = values.pop()
+        last_handle = handles.pop()
+        if index < len(values):
+            priorities[index] = priority
+            values[index] = last_value
+            handles[index] = last_handle
+            last_handle.index = index
+            self._sift_down(index)
+            self._sift_up(last_handle.index)
+        return value
+
+    def _sift_up(self, index):
+        priorities, values, handles = self.priorities, self.values, self.handles
+        arity = self.arity
+        priority, value, handle = priorities[index], values[index], handles[index]
+        while index:
+            parent = (index - 1) // arity
+            if priorities[parent] <= priority:
+                break
+            priorities[index] = priorities[parent]
+            values[index] = values[parent]
+            moved = handles[index] = handles[parent]
+            moved.index = index
+            index = parent
+        priorities[index], values[index], handles[index] = priority, value, handle
+        handle.index = index
+
+    def _sift_down(self, index):
+        priorities, values, handles = self.priorities, self.values, self.handles
+        arity = self.arity
+        count = len(priorities)
+        priority, value, handle = priorities[index], values[index], handles[index]
+        while True:
+            first = index * arity + 1
+            if first >= count:
+                break
+            # Slicing, min() and index() pick the smallest child in C.
+            children = priorities[first : first + arity]
+            smallest = min(children)
+            if smallest >= priority:
+                break
+            child = first + children.index(smallest)
+            priorities[index] = smallest
+            values[index] = values[child]
+            moved = handles[index] = handles[child]
+            moved.index = index
+            index = child
+        priorities[index], values[index], handles[index] = priority, value, handle
+        handle.index = index
+
+    def _snapshot(self):
+        meta = {"arity": self.arity, "dtype": self.dtype}
+        return meta, [list(self.values), list(self.priorities)]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        queue = cls(meta["arity"], meta["dtype"])
+        queue.push_many(zip(*sections))
+        return queue
+
+    def _footprint(self, deep):
+        count = len(self.values)
+        container, payload = _storage_size(self.priorities, count, deep)
+        container += _object_size(self) + sys.getsizeof(self.values)
+        container += sys.getsizeof(self.handles)
+        nodes = count * sys.getsizeof(self.handles[0]) if count else 0
+        if deep:
+            payload += _values_size(self.values)
+        return container, nodes, payload, count
 
 
 class TreeNode:
+    __slots__ = ("value", "right", "left", "height", "size")
+
     def __init__(self, value: int):
         """
         Initialize a tree node with value.
@@ -391,14 +2583,79 @@ class TreeNode:
         self.value = value
         self.right = None
         self.left = None
+        self.height = 1
+        self.size = 1
 
 
-class BinarySearchTree:
-    def __init__(self):
+class BinarySearchTree(_Snapshot, _MemoryUsage):
+    def __init__(self, balanced: bool = False):
         """
         Initialize an empty binary search tree.
+
+        With balanced=True the tree rebalances itself (AVL) on every insert
+        and delete, so operations stay O(log n) even for sorted input.
         """
         self.root = None
+        self.balanced = balanced
+
+    @classmethod
+    def from_sorted(cls, iterable, balanced: bool = None) -> "BinarySearchTree":
+        """
+        Build a perfectly balanced tree from sorted values in O(n).
+        Adjacent duplicates are dropped; unsorted input raises ValueError.
+        balanced defaults to the class's own default.
+        """
+        values = []
+        for value in iterable:
+            if values and value <= values[-1]:
+                if value == values[-1]:
+                    continue
+                raise ValueError("from_sorted() requires sorted input")
+            values.append(value)
+        tree = cls() if balanced is None else cls(balanced=balanced)
+        tree.root = cls._build_balanced(values)
+        return tree
+
+    @staticmethod
+    def _build_balanced(values):
+        root = None
+        stack = [(0, len(values) - 1, None, False)] if values else []
+        while stack:
+            lo, hi, parent, is_left = stack.pop()
+            mid = (lo + hi) // 2
+            node = TreeNode(values[mid])
+            node.size = hi - lo + 1
+            node.height = node.size.bit_length()
+            if parent is None:
+                root = node
+            elif is_left:
+                parent.left = node
+            else:
+                parent.right = node
+            if lo < mid:
+                stack.append((lo, mid - 1, node, True))
+            if mid < hi:
+                stack.append((mid + 1, hi, node, False))
+        return root
+
+    def insert_many(self, iterable) -> None:
+        """
+        Insert a batch of values. Large batches are merged with the existing
+        values and the tree is rebuilt balanced in O(n + k) instead of
+        paying O(h) per single insert.
+        """
+        batch = sorted(set(iterable))
+        if not batch:
+            return
+        if len(batch) * (self.height() + 1) < self.size() + len(batch):
+            for value in batch:
+                self.insert(value)
+            return
+        merged = []
+        for value in heapq.merge(self.iter_inorder(), batch):
+            if not merged or merged[-1] != value:
+                merged.append(value)
+        self.root = self._build_balanced(merged)
 
     def insert(self, value: int) -> None:
         """
@@ -409,30 +2666,33 @@ class BinarySearchTree:
             self.root = node_to_add
             return
 
+        path = []
         current = self.root
         while True:
+            path.append(current)
             if value < current.value:
                 if current.left is None:
                     current.left = node_to_add
-                    return
+                    break
                 current = current.left
             elif value > current.value:
                 if current.right is None:
                     current.right = node_to_add
-                    return
+                    break
                 current = current.right
             else:
                 return
+        self._fix_path(path)
 
     def delete(self, value: int) -> None:
         """
         Remove a node with a specific value from the binary search tree.
         """
-        parent = None
+        path = []
         current = self.root
 
         while current is not None and current.value != value:
-            parent = current
+            path.append(current)
             if value < current.value:
                 current = current.left
             else:
@@ -444,27 +2704,85 @@ class BinarySearchTree:
         # 0 or 1 child
         if current.left is None or current.right is None:
             new_child = current.left if current.left else current.right
+            parent = path[-1] if path else None
             if parent is None:  # root
                 self.root = new_child
-            elif parent.left == current:
+            elif parent.left is current:
                 parent.left = new_child
             else:
                 parent.right = new_child
 
         else:  # 2 children
+            path.append(current)
             successor_parent = current
             successor = current.right
             while successor.left:
                 successor_parent = successor
+                path.append(successor)
                 successor = successor.left
 
             current.value = successor.value
 
-            if successor_parent.left == successor:
+            if successor_parent.left is successor:
                 successor_parent.left = successor.right
             else:
                 successor_parent.right = successor.right
 
+        self._fix_path(path)
+
+    def _fix_path(self, path):
+        """
+        Refresh the cached heights and sizes along a root-to-node path, bottom-up,
+        rotating subtrees back into shape when the tree is balanced.
+        """
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            if self.balanced:
+                subtree = self._rebalance(node)
+            else:
+                self._update(node)
+                subtree = node
+            if subtree is not node:
+                if i == 0:
+                    self.root = subtree
+                elif path[i - 1].left is node:
+                    path[i - 1].left = subtree
+                else:
+                    path[i - 1].right = subtree
+
+    def _update(self, node):
+        node.height = max(self._height(node.left), self._height(node.right)) + 1
+        node.size = self._size(node.left) + self._size(node.right) + 1
+
+    def _rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rebalance(self, node):
+        self._update(node)
+        balance = self._height(node.left) - self._height(node.right)
+        if balance > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+        if balance < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
+        return node
+
     def search(self, value: int) -> TreeNode:
         """
         Search for a node with a specific value in the binary search tree.
@@ -489,13 +2807,69 @@ class BinarySearchTree:
         """
         Perform an in-order traversal of the binary search tree.
         """
+        return list(self.iter_inorder())
+
+    def iter_inorder(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the values in sorted order, using O(h) memory.
+        """
+        stack = []
+        current = self.root
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.left
+            current = stack.pop()
+            yield current.value
+            current = current.right
+
+    def iter_preorder(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the values in pre-order, using O(h) memory.
+        """
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node.value
+            if node.right is not None:
+                stack.append(node.right)
+            if node.left is not None:
+                stack.append(node.left)
+
+    def iter_postorder(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the values in post-order, using O(h) memory.
+        """
+        stack = []
+        last = None
+        current = self.root
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.left
+            node = stack[-1]
+            if node.right is not None and node.right is not last:
+                current = node.right
+            else:
+                stack.pop()
+                yield node.value
+                last = node
 
-        def _inorder(node):
-            if node is None:
-                return []
-            return _inorder(node.left) + [node.value] + _inorder(node.right)
+    def iter_level_order(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the values level by level (breadth-first).
+        """
+        queue = deque([self.root] if self.root is not None else [])
+        while queue:
+            node = queue.popleft()
+            yield node.value
+            if node.left:
+                queue.append(node.left)
+            if node.right:
+                queue.append(node.right)
 
-        return _inorder(self.root)
+    def __iter__(self):
+        return self.iter_inorder()
 
     def size(self) -> int:
         """
@@ -506,7 +2880,49 @@ class BinarySearchTree:
     def _size(self, node):
         if node is None:
             return 0
-        return self._size(node.left) + self._size(node.right) + 1
+        return node.size
+
+    def rank(self, value: int) -> int:
+        """
+        Returns the number of values in the tree strictly smaller than value.
+        """
+        return self._count_below(value, False)
+
+    def select(self, k: int) -> TreeNode:
+        """
+        Returns the node holding the k-th smallest value (0-based).
+        """
+        if not 0 <= k < self.size():
+            raise IndexError
+        current = self.root
+        while True:
+            left_size = self._size(current.left)
+            if k < left_size:
+                current = current.left
+            elif k > left_size:
+                k -= left_size + 1
+                current = current.right
+            else:
+                return current
+
+    def count_range(self, lo: int, hi: int) -> int:
+        """
+        Returns the number of values v in the tree with lo <= v <= hi.
+        """
+        if hi < lo:
+            return 0
+        return self._count_below(hi, True) - self._count_below(lo, False)
+
+    def _count_below(self, value, inclusive):
+        count = 0
+        current = self.root
+        while current is not None:
+            if current.value < value or (inclusive and current.value == value):
+                count += self._size(current.left) + 1
+                current = current.right
+            else:
+                current = current.left
+        return count
 
     def is_empty(self) -> bool:
         """
@@ -523,49 +2939,25 @@ class BinarySearchTree:
     def _height(self, node):
         if node is None:
             return 0
-        left = self._height(node.left)
-        right = self._height(node.right)
-        return max(left, right) + 1
+        return node.height
 
     def preorder_traversal(self) -> List[int]:
         """
         Perform a pre-order traversal of the tree.
         """
-
-        def _preorder(node):
-            if node is None:
-                return []
-            return [node.value] + _preorder(node.left) + _preorder(node.right)
-
-        return _preorder(self.root)
+        return list(self.iter_preorder())
 
     def postorder_traversal(self) -> List[int]:
         """
         Perform a post-order traversal of the tree.
         """
-
-        def _postorder(node):
-            if node is None:
-                return []
-            return _postorder(node.left) + _postorder(node.right) + [node.value]
-
-        return _postorder(self.root)
+        return list(self.iter_postorder())
 
     def level_order_traversal(self) -> List[int]:
         """
         Perform a level order (breadth-first) traversal of the tree.
         """
-        if not self.root:
-            return []
-        queue, result = [self.root], []
-        while queue:
-            node = queue.pop(0)  # Note: pop(0) is less efficient than deque.popleft()
-            result.append(node.value)
-            if node.left:
-                queue.append(node.left)
-            if node.right:
-                queue.append(node.right)
-        return result
+        return list(self.iter_level_order())
 
     def minimum(self) -> TreeNode:
         """
@@ -585,20 +2977,1051 @@ class BinarySearchTree:
             current = current.right
         return current
 
+    def floor(self, value: int) -> TreeNode:
+        """
+        Returns the node with the largest value less than or equal to value.
+        """
+        return self._closest(value, True, True)
+
+    def ceiling(self, value: int) -> TreeNode:
+        """
+        Returns the node with the smallest value greater than or equal to value.
+        """
+        return self._closest(value, False, True)
+
+    def predecessor(self, value: int) -> TreeNode:
+        """
+        Returns the node with the largest value strictly less than value.
+        """
+        return self._closest(value, True, False)
+
+    def successor(self, value: int) -> TreeNode:
+        """
+        Returns the node with the smallest value strictly greater than value.
+        """
+        return self._closest(value, False, False)
+
+    def _closest(self, value, below, inclusive):
+        best = None
+        current = self.root
+        while current is not None:
+            if current.value == value and inclusive:
+                return current
+            if (current.value < value) if below else (current.value <= value):
+                if below:
+                    best = current
+                current = current.right
+            else:
+                if not below:
+                    best = current
+                current = current.left
+        return best
+
+    def range(self, lo: int, hi: int) -> Generator[int, None, None]:
+        """
+        Lazily yield the values v with lo <= v <= hi in sorted order,
+        visiting only the nodes on the boundary paths and inside the range.
+        """
+        stack = []
+        current = self.root
+        while stack or current is not None:
+            while current is not None:
+                if current.value < lo:
+                    current = current.right
+                else:
+                    stack.append(current)
+                    current = current.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.value > hi:
+                return
+            yield node.value
+            current = node.right
+
     def is_valid_bst(self) -> bool:
         """
         Check if the tree is a valid binary search tree.
         """
+        previous = None
+        for index, value in enumerate(self.iter_inorder()):
+            if index and value <= previous:
+                return False
+            previous = value
+        return True
+
+    def _snapshot(self):
+        return {"balanced": self.balanced}, [self.inorder_traversal()]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        return cls.from_sorted(sections[0], balanced=meta["balanced"])
+
+    def _footprint(self, deep):
+        count = self.size()
+        nodes = count * sys.getsizeof(self.root) if self.root is not None else 0
+        payload = _values_size(self.iter_inorder()) if deep else 0
+        return _object_size(self), nodes, payload, count
+
+
+class PersistentBinarySearchTree(BinarySearchTree):
+    def __init__(self, balanced: bool = True):
+        """
+        Initialize an empty persistent binary search tree. Updates copy the
+        O(log n) nodes on the changed path, so snapshot() is O(1) and old
+        versions share every untouched subtree.
+        """
+        super().__init__(balanced=balanced)
+
+    def snapshot(self) -> "PersistentBinarySearchTree":
+        """
+        Returns an immutable view of the current version in O(1).
+        """
+        snapshot = type(self)(balanced=self.balanced)
+        snapshot.root = self.root
+        return snapshot
+
+    def insert(self, value: int) -> None:
+        """
+        Insert a value, path-copying from the new leaf up to a new root.
+        """
+        path = []
+        went_left = []
+        current = self.root
+        while current is not None:
+            if value == current.value:
+                return
+            path.append(current)
+            went_left.append(value < current.value)
+            current = current.left if went_left[-1] else current.right
+        self.root = self._copy_path(path, went_left, TreeNode(value))
+
+    def delete(self, value: int) -> None:
+        """
+        Remove a value, path-copying up to a new root. A node with two
+        children is replaced by a copy holding its successor's value.
+        """
+        path = []
+        went_left = []
+        current = self.root
+        while current is not None and current.value != value:
+            path.append(current)
+            went_left.append(value < current.value)
+            current = current.left if went_left[-1] else current.right
+        if current is None:
+            return
+
+        if current.left is None or current.right is None:
+            replacement = current.left if current.left else current.right
+        else:
+            spine = []
+            successor = current.right
+            while successor.left is not None:
+                spine.append(successor)
+                successor = successor.left
+            right = self._copy_path(spine, [True] * len(spine), successor.right)
+            replacement = self._copy(current)
+            replacement.value = successor.value
+            replacement.right = right
+            replacement = self._refresh(replacement)
+
+        self.root = self._copy_path(path, went_left, replacement)
+
+    def _copy_path(self, path, went_left, child):
+        for node, left in zip(reversed(path), reversed(went_left)):
+            node = self._copy(node)
+            if left:
+                node.left = child
+            else:
+                node.right = child
+            child = self._refresh(node)
+        return child
+
+    def _refresh(self, node):
+        if self.balanced:
+            return self._rebalance(node)
+        self._update(node)
+        return node
+
+    @staticmethod
+    def _copy(node):
+        clone = TreeNode(node.value)
+        clone.left = node.left
+        clone.right = node.right
+        clone.height = node.height
+        clone.size = node.size
+        return clone
+
+    def _rotate_left(self, node):
+        node = self._copy(node)
+        node.right = self._copy(node.right)
+        return super()._rotate_left(node)
+
+    def _rotate_right(self, node):
+        node = self._copy(node)
+        node.left = self._copy(node.left)
+        return super()._rotate_right(node)
+
+
+class BTreeNode:
+    __slots__ = ("keys", "values", "children", "next")
+
+    def __init__(self, leaf: bool = True):
+        """
+        Initialize a B+ tree node. Leaves hold sorted keys with their values
+        and are chained through next; internal nodes hold separator keys
+        and children.
+        """
+        self.keys = []
+        self.values = [] if leaf else None
+        self.children = None if leaf else []
+        self.next = None
+
+
+class BTree(_Snapshot, _MemoryUsage):
+    def __init__(self, fanout: int = 64):
+        """
+        Initialize an empty B+ tree ordered map. Each node holds up to
+        fanout keys (leaves) or children (internal nodes) in flat lists,
+        so a lookup touches O(log_fanout n) nodes instead of O(log n).
+        """
+        if fanout < 4:
+            raise ValueError("fanout must be at least 4")
+        self.fanout = fanout
+        self.root = BTreeNode()
+        self.count = 0
 
-        def _is_valid(node, min_val, max_val):
-            if node is None:
-                return True
-            if (min_val is not None and node.value <= min_val) or (
-                max_val is not None and node.value >= max_val
+    def _find_leaf(self, key):
+        node = self.root
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    def _find_path(self, key):
+        path = []
+        node = self.root
+        while node.children is not None:
+            index = bisect_right(node.keys, key)
+            path.append((node, index))
+            node = node.children[index]
+        return node, path
+
+    def insert(self, key: int, value: Any = None) -> None:
+        """
+        Insert a key (with an optional value) into the tree, replacing the
+        value if the key is already present.
+        """
+        leaf, path = self._find_path(key)
+        index = bisect_left(leaf.keys, key)
+        if index < len(leaf.keys) and leaf.keys[index] == key:
+            leaf.values[index] = value
+            return
+        leaf.keys.insert(index, key)
+        leaf.values.insert(index, value)
+        self.count += 1
+        if len(leaf.keys) <= self.fanout:
+            return
+
+        mid = len(leaf.keys) // 2
+        right = BTreeNode()
+        right.keys = leaf.keys[mid:]
+        right.values = leaf.values[mid:]
+        del leaf.keys[mid:]
+        del leaf.values[mid:]
+        right.next = leaf.next
+        leaf.next = right
+        separator = right.keys[0]
+        node = leaf
+
+        while path:
+            parent, index = path.pop()
+            parent.keys.insert(index, separator)
+            parent.children.insert(index + 1, right)
+            if len(parent.children) <= self.fanout:
+                return
+            mid = len(parent.children) // 2
+            right = BTreeNode(leaf=False)
+            separator = parent.keys[mid - 1]
+            right.keys = parent.keys[mid:]
+            right.children = parent.children[mid:]
+            del parent.keys[mid - 1 :]
+            del parent.children[mid:]
+            node = parent
+
+        root = BTreeNode(leaf=False)
+        root.keys = [separator]
+        root.children = [node, right]
+        self.root = root
+
+    def delete(self, key: int) -> None:
+        """
+        Remove a key from the tree.
+        """
+        leaf, path = self._find_path(key)
+        index = bisect_left(leaf.keys, key)
+        if index == len(leaf.keys) or leaf.keys[index] != key:
+            return
+        del leaf.keys[index]
+        del leaf.values[index]
+        self.count -= 1
+
+        minimum = self.fanout // 2
+        node = leaf
+        while path and self._fill(node) < minimum:
+            parent, index = path.pop()
+            self._fix_underflow(parent, index, minimum)
+            node = parent
+        if self.root.children is not None and len(self.root.children) == 1:
+            self.root = self.root.children[0]
+
+    def _fill(self, node):
+        return len(node.keys) if node.children is None else len(node.children)
+
+    def _fix_underflow(self, parent, index, minimum):
+        child = parent.children[index]
+        leaf = child.children is None
+        if index > 0 and self._fill(parent.children[index - 1]) > minimum:
+            left = parent.children[index - 1]
+            if leaf:
+                child.keys.insert(0, left.keys.pop())
+                child.values.insert(0, left.values.pop())
+                parent.keys[index - 1] = child.keys[0]
+            else:
+                child.keys.insert(0, parent.keys[index - 1])
+                child.children.insert(0, left.children.pop())
+                parent.keys[index - 1] = left.keys.pop()
+        elif (
+            index + 1 < len(parent.children)
+            and self._fill(parent.children[index + 1]) > minimum
+        ):
+            right = parent.children[index + 1]
+            if leaf:
+                child.keys.append(right.keys.pop(0))
+                child.values.append(right.values.pop(0))
+                parent.keys[index] = right.keys[0]
+            else:
+                child.keys.append(parent.keys[index])
+                child.children.append(right.children.pop(0))
+                parent.keys[index] = right.keys.pop(0)
+        else:
+            if index == 0:
+                index += 1
+            left, right = parent.children[index - 1], parent.children[index]
+            if leaf:
+                left.keys.extend(right.keys)
+                left.values.extend(right.values)
+                left.next = right.next
+            else:
+                left.keys.append(parent.keys[index - 1])
+                left.keys.extend(right.keys)
+                left.children.extend(right.children)
+            del parent.keys[index - 1]
+            del parent.children[index]
+
+    def search(self, key: int) -> BTreeNode:
+        """
+        Search for the leaf node holding a specific key. A leaf holds many
+        keys, so unlike BinarySearchTree.search the node is not per key; use
+        get for the key's value.
+        """
+        leaf = self._find_leaf(key)
+        index = bisect_left(leaf.keys, key)
+        if index < len(leaf.keys) and leaf.keys[index] == key:
+            return leaf
+        return None
+
+    def get(self, key: int, default: Any = None) -> Any:
+        """
+        Returns the value stored for a key, or default if it is absent.
+        """
+        leaf = self._find_leaf(key)
+        index = bisect_left(leaf.keys, key)
+        if index < len(leaf.keys) and leaf.keys[index] == key:
+            return leaf.values[index]
+        return default
+
+    def __contains__(self, key):
+        return self.search(key) is not None
+
+    def __len__(self):
+        return self.count
+
+    def size(self) -> int:
+        """
+        Returns the number of keys in the tree.
+        """
+        return self.count
+
+    def is_empty(self) -> bool:
+        """
+        Checks if the tree is empty.
+        """
+        return self.count == 0
+
+    def height(self) -> int:
+        """
+        Returns the number of levels in the tree.
+        """
+        if self.count == 0:
+            return 0
+        levels = 1
+        node = self.root
+        while node.children is not None:
+            node = node.children[0]
+            levels += 1
+        return levels
+
+    def minimum(self) -> int:
+        """
+        Returns the smallest key in the tree (a key, not a node as in
+        BinarySearchTree), or None if it is empty.
+        """
+        if self.count == 0:
+            return None
+        node = self.root
+        while node.children is not None:
+            node = node.children[0]
+        return node.keys[0]
+
+    def maximum(self) -> int:
+        """
+        Returns the largest key in the tree (a key, not a node as in
+        BinarySearchTree), or None if it is empty.
+        """
+        if self.count == 0:
+            return None
+        node = self.root
+        while node.children is not None:
+            node = node.children[-1]
+        return node.keys[-1]
+
+    def _first_leaf(self):
+        node = self.root
+        while node.children is not None:
+            node = node.children[0]
+        return node
+
+    def iter_inorder(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the keys in sorted order by walking the leaf chain.
+        """
+        leaf = self._first_leaf()
+        while leaf is not None:
+            yield from leaf.keys
+            leaf = leaf.next
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def items(self) -> Generator[tuple, None, None]:
+        """
+        Lazily yield (key, value) pairs in key order.
+        """
+        leaf = self._first_leaf()
+        while leaf is not None:
+            yield from zip(leaf.keys, leaf.values)
+            leaf = leaf.next
+
+    def inorder_traversal(self) -> List[int]:
+        """
+        Returns all keys in sorted order.
+        """
+        return list(self.iter_inorder())
+
+    def preorder_traversal(self) -> List[List[int]]:
+        """
+        Returns the keys of every node, each node before its children.
+        """
+        if self.count == 0:
+            return []
+        result = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            result.append(list(node.keys))
+            if node.children is not None:
+                stack.extend(reversed(node.children))
+        return result
+
+    def postorder_traversal(self) -> List[List[int]]:
+        """
+        Returns the keys of every node, each node after its children.
+        """
+        if self.count == 0:
+            return []
+        result = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            result.append(list(node.keys))
+            if node.children is not None:
+                stack.extend(node.children)
+        result.reverse()
+        return result
+
+    def level_order_traversal(self) -> List[List[int]]:
+        """
+        Returns the keys of every node, level by level (breadth-first).
+        """
+        if self.count == 0:
+            return []
+        result = []
+        queue = deque([self.root])
+        while queue:
+            node = queue.popleft()
+            result.append(list(node.keys))
+            if node.children is not None:
+                queue.extend(node.children)
+        return result
+
+    def range(self, lo: int, hi: int) -> Generator[int, None, None]:
+        """
+        Lazily yield the keys k with lo <= k <= hi in sorted order.
+        """
+        leaf = self._find_leaf(lo)
+        start = bisect_left(leaf.keys, lo)
+        while leaf is not None:
+            keys = leaf.keys
+            stop = bisect_right(keys, hi)
+            yield from keys[start:stop]
+            if stop < len(keys):
+                return
+            leaf = leaf.next
+            start = 0
+
+    def _snapshot(self):
+        keys, values = [], []
+        leaf = self._first_leaf()
+        while leaf is not None:
+            keys += leaf.keys
+            values += leaf.values
+            leaf = leaf.next
+        return {"fanout": self.fanout}, [keys, values]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        tree = cls(meta["fanout"])
+        keys, values = sections
+        if not keys:
+            return tree
+        level, lows = [], []
+        for start, stop in _even_chunks(len(keys), tree.fanout):
+            leaf = BTreeNode()
+            leaf.keys = list(keys[start:stop])
+            leaf.values = list(values[start:stop])
+            if level:
+                level[-1].next = leaf
+            level.append(leaf)
+            lows.append(leaf.keys[0])
+        while len(level) > 1:
+            parents, parent_lows = [], []
+            for start, stop in _even_chunks(len(level), tree.fanout):
+                parent = BTreeNode(leaf=False)
+                parent.children = level[start:stop]
+                parent.keys = lows[start + 1 : stop]
+                parents.append(parent)
+                parent_lows.append(lows[start])
+            level, lows = parents, parent_lows
+        tree.root = level[0]
+        tree.count = len(keys)
+        return tree
+
+    def _footprint(self, deep):
+        nodes = payload = 0
+        level = [self.root]
+        while level:
+            for node in level:
+                nodes += sys.getsizeof(node) + sys.getsizeof(node.keys)
+                if node.children is None:
+                    nodes += sys.getsizeof(node.values)
+                    if deep:
+                        payload += _values_size(node.keys) + _values_size(node.values)
+                else:
+                    nodes += sys.getsizeof(node.children)
+            level = [
+                child
+                for node in level
+                if node.children is not None
+                for child in node.children
+            ]
+        return _object_size(self), nodes, payload, self.count
+
+
+class SkipNode:
+    __slots__ = ("value", "forward", "deleted")
+
+    def __init__(self, value: int, level: int):
+        """
+        Initialize a skip list node with forward links on level levels.
+        """
+        self.value = value
+        self.forward = [None] * level
+        self.deleted = False
+
+
+class SkipList(_Snapshot, _MemoryUsage):
+    MAX_LEVEL = 32
+
+    def __init__(self, p: float = 0.25, seed: int = None):
+        """
+        Initialize an empty skip list ordered set. Writers take a lock;
+        readers never do, as nodes are linked bottom-up and unlinked top-down.
+        """
+        self.p = p
+        self.head = SkipNode(None, self.MAX_LEVEL)
+        self.level = 1
+        self.count = 0
+        self.random = random.Random(seed)
+        self.write_lock = threading.Lock()
+
+    def _random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and self.random.random() < self.p:
+            level += 1
+        return level
+
+    def _predecessors(self, value):
+        update = [self.head] * self.MAX_LEVEL
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and following.value < value:
+                node = following
+                following = node.forward[i]
+            update[i] = node
+        return update
+
+    def insert(self, value: int) -> None:
+        """
+        Insert a value into the skip list.
+        """
+        with self.write_lock:
+            update = self._predecessors(value)
+            following = update[0].forward[0]
+            if following is not None and following.value == value:
+                return
+            level = self._random_level()
+            node_to_add = SkipNode(value, level)
+            for i in range(level):
+                node_to_add.forward[i] = update[i].forward[i]
+            for i in range(level):
+                update[i].forward[i] = node_to_add
+            if level > self.level:
+                self.level = level
+            self.count += 1
+
+    def delete(self, value: int) -> None:
+        """
+        Remove a value from the skip list.
+        """
+        with self.write_lock:
+            update = self._predecessors(value)
+            node_to_remove = update[0].forward[0]
+            if node_to_remove is None or node_to_remove.value != value:
+                return
+            node_to_remove.deleted = True
+            for i in range(len(node_to_remove.forward) - 1, -1, -1):
+                update[i].forward[i] = node_to_remove.forward[i]
+            while self.level > 1 and self.head.forward[self.level - 1] is None:
+                self.level -= 1
+            self.count -= 1
+
+    def _first_at_least(self, value):
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            following = node.forward[i]
+            while following is not None and following.value < value:
+                node = following
+                following = node.forward[i]
+        return node.forward[0]
+
+    def search(self, value: int) -> SkipNode:
+        """
+        Search for the node with a specific value.
+        """
+        node = self._first_at_least(value)
+        if node is not None and node.value == value and not node.deleted:
+            return node
+        return None
+
+    def __contains__(self, value):
+        return self.search(value) is not None
+
+    def minimum(self) -> SkipNode:
+        """
+        Returns the node with the minimum value.
+        """
+        node = self.head.forward[0]
+        while node is not None and node.deleted:
+            node = node.forward[0]
+        return node
+
+    def maximum(self) -> SkipNode:
+        """
+        Returns the node with the maximum value.
+        """
+        node = self.head
+        for i in range(self.level - 1, -1, -1):
+            while node.forward[i] is not None:
+                node = node.forward[i]
+        if node.deleted:
+            # A writer removed it mid-walk; retry from the new top.
+            return self.maximum()
+        return node if node is not self.head else None
+
+    def iter_inorder(self) -> Generator[int, None, None]:
+        """
+        Lazily yield the values in sorted order.
+        """
+        node = self.head.forward[0]
+        while node is not None:
+            if not node.deleted:
+                yield node.value
+            node = node.forward[0]
+
+    def __iter__(self):
+        return self.iter_inorder()
+
+    def inorder_traversal(self) -> List[int]:
+        """
+        Returns all values in sorted order.
+        """
+        return list(self.iter_inorder())
+
+    def range(self, lo: int, hi: int) -> Generator[int, None, None]:
+        """
+        Lazily yield the values v with lo <= v <= hi in sorted order.
+        """
+        node = self._first_at_least(lo)
+        while node is not None and node.value <= hi:
+            if not node.deleted:
+                yield node.value
+            node = node.forward[0]
+
+    def size(self) -> int:
+        """
+        Returns the number of values in the skip list.
+        """
+        return self.count
+
+    def __len__(self):
+        return self.count
+
+    def is_empty(self) -> bool:
+        """
+        Checks if the skip list is empty.
+        """
+        return self.count == 0
+
+    def _snapshot(self):
+        return {"p": self.p}, [self.inorder_traversal()]
+
+    @classmethod
+    def _restore(cls, meta, sections):
+        skip_list = cls(meta["p"])
+        for value in sections[0]:
+            skip_list.insert(value)
+        return skip_list
+
+    def __deepcopy__(self, memo):
+        # The write lock cannot be deep-copied; rebuild from a snapshot.
+        clone = self._restore(*copy.deepcopy(self._snapshot(), memo))
+        memo[id(self)] = clone
+        return clone
+
+    def _footprint(self, deep):
+        nodes = payload = 0
+        node = self.head
+        while node is not None:
+            nodes += sys.getsizeof(node) + sys.getsizeof(node.forward)
+            if deep and node is not self.head:
+                payload += _values_size((node.value,))
+            node = node.forward[0]
+        return _object_size(self), nodes, payload, self.count
+
+
+def _hops(node, value):
+    # Nodes a front-to-back scan for value visits.
+    hops = 0
+    while node is not None:
+        hops += 1
+        if node.value == value:
+            break
+        node = node.next
+    return hops
+
+
+def _depth(node, value):
+    # Nodes a root-to-leaf descent towards value visits.
+    depth = 0
+    while node is not None:
+        depth += 1
+        if value == node.value:
+            break
+        node = node.left if value < node.value else node.right
+    return depth
+
+
+def _list_hops(linked_list, value, *args):
+    if getattr(linked_list, "index", None) is not None:
+        return 1
+    return _hops(linked_list.head, value)
+
+
+def _tree_depth(tree, value, *args):
+    return _depth(tree.root, value)
+
+
+def _btree_height(tree, *args, **kwargs):
+    return tree.height()
+
+
+def _queue_depth(queue, *args, **kwargs):
+    return queue.size()
+
+
+def _position(linked_list, position, *args):
+    return position
+
+
+# Probes run before an instrumented call, outside the timed section, and
+# measure the work the call is about to do: (metric, probe(self, *args)).
+_PROBES = {
+    SinglyLinkedList: {
+        "find": ("nodes_visited", _list_hops),
+        "delete": ("nodes_visited", _list_hops),
+        "insert": ("nodes_visited", _position),
+    },
+    DoublyLinkedList: {
+        "find": ("nodes_visited", _list_hops),
+        "delete": ("nodes_visited", _list_hops),
+        "move_to_front": ("nodes_visited", _list_hops),
+        "move_to_back": ("nodes_visited", _list_hops),
+        "insert": ("nodes_visited", _position),
+    },
+    BinarySearchTree: {
+        name: ("nodes_visited", _tree_depth)
+        for name in (
+            "search",
+            "insert",
+            "delete",
+            "floor",
+            "ceiling",
+            "predecessor",
+            "successor",
+            "rank",
+        )
+    },
+    BTree: {
+        name: ("nodes_visited", _btree_height)
+        for name in ("search", "get", "insert", "delete")
+    },
+    Queue: {
+        name: ("queue_depth", _queue_depth)
+        for name in ("enqueue", "enqueue_many", "dequeue", "dequeue_many")
+    },
+    ConcurrentQueue: {
+        name: ("queue_depth", _queue_depth)
+        for name in ("put", "put_many", "get", "get_many")
+    },
+    SharedMemoryQueue: {
+        name: ("queue_depth", _queue_depth)
+        for name in ("enqueue", "enqueue_many", "dequeue", "dequeue_many")
+    },
+    PriorityQueue: {
+        name: ("queue_depth", _queue_depth)
+        for name in ("push", "push_many", "pop", "pop_many")
+    },
+}
+
+
+class _CallState(threading.local):
+    # Per-thread instrumentation state: how many instrumented calls are on the
+    # stack, and whether a probe is running.
+    depth = 0
+    probing = False
+
+
+class Instrumentation:
+    """
+    Probes run before the measured call and re-walk the structure (a list
+    scan or tree descent), so an instrumented call costs roughly 2-3x an
+    uninstrumented one. nodes_visited is the probe's prediction of the
+    nodes the call will visit; key comparisons are not recorded. Nested
+    instrumented calls are counted and timed but not probed.
+    """
+
+    def __init__(self, callback=None):
+        """
+        Initialize opt-in call counters, latency histograms and probe metrics.
+        attach() wraps methods and detach() restores them; callback, if given,
+        receives one event dict per instrumented call.
+        """
+        self.callback = callback
+        self.operations = {}
+        self.patches = []
+        self.lock = threading.Lock()
+        self.state = _CallState()
+
+    def attach(self, target, methods=None) -> None:
+        """
+        Instrument the named methods of a class or instance, by default all
+        of its public, non-generator methods.
+        """
+        cls = target if isinstance(target, type) else type(target)
+        if methods is None:
+            methods = [
+                name
+                for name in dir(cls)
+                if not name.startswith("_")
+                and inspect.isfunction(inspect.getattr_static(cls, name))
+                and not inspect.isgeneratorfunction(inspect.getattr_static(cls, name))
+            ]
+        for name in methods:
+            if any(
+                patched is target and patched_name == name
+                for patched, patched_name, _ in self.patches
             ):
-                return False
-            return _is_valid(node.left, min_val, node.value) and _is_valid(
-                node.right, node.value, max_val
-            )
+                raise ValueError(f"{cls.__name__}.{name} is already instrumented")
+            original = vars(target).get(name, _MISSING)
+            setattr(target, name, self._wrap(target, cls, name))
+            self.patches.append((target, name, original))
+
+    def detach(self) -> None:
+        """
+        Restore every instrumented method. Collected stats are kept.
+        """
+        while self.patches:
+            target, name, original = self.patches.pop()
+            if original is _MISSING:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns per-operation calls, total and max latency, the latency
+        histogram (upper bound in ns -> calls) and probe metrics.
+        """
+        with self.lock:
+            return {
+                key: {
+                    "calls": operation["calls"],
+                    "total_seconds": operation["total_seconds"],
+                    "max_seconds": operation["max_seconds"],
+                    "latency_ns": {
+                        1 << bucket: count
+                        for bucket, count in sorted(operation["latency_ns"].items())
+                    },
+                    **{
+                        metric: dict(values)
+                        for metric, values in operation["metrics"].items()
+                    },
+                }
+                for key, operation in self.operations.items()
+            }
+
+    def reset(self) -> None:
+        """
+        Clear the collected stats.
+        """
+        with self.lock:
+            self.operations.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detach()
+
+    def _wrap(self, target, cls, name):
+        func = getattr(target, name)
+        key = f"{cls.__name__}.{name}"
+        metric, probe = None, None
+        for klass in cls.__mro__:
+            if name in _PROBES.get(klass, ()):
+                metric, probe = _PROBES[klass][name]
+                break
+        if probe is not None and not isinstance(target, type):
+            probe = functools.partial(probe, target)
+        signature = inspect.signature(func) if probe is not None else None
+        record = self._record
+        run_probe = self._probe
+        state = self.state
+        perf_counter = time.perf_counter
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                work = run_probe(probe, signature, args, kwargs)
+                start = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(key, perf_counter() - start, metric, work)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if state.probing:
+                    return func(*args, **kwargs)
+                work = run_probe(probe, signature, args, kwargs)
+                state.depth += 1
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    seconds = perf_counter() - start
+                    state.depth -= 1
+                    record(key, seconds, metric, work)
+
+        return wrapper
+
+    def _probe(self, probe, signature, args, kwargs):
+        # Only the outermost instrumented call is probed, and calls the probe
+        # itself makes (e.g. tree.height()) are neither probed nor recorded.
+        state = self.state
+        if probe is None or state.depth:
+            return None
+        # Probes take the method's arguments positionally, however the caller
+        # passed them; arguments that do not bind are left to the call itself.
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            return None
+        state.probing = True
+        try:
+            return probe(*bound.args)
+        finally:
+            state.probing = False
+
+    def _record(self, key, seconds, metric, work):
+        with self.lock:
+            operation = self.operations.get(key)
+            if operation is None:
+                operation = self.operations[key] = {
+                    "calls": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "latency_ns": {},
+                    "metrics": {},
+                }
+            operation["calls"] += 1
+            operation["total_seconds"] += seconds
+            operation["max_seconds"] = max(operation["max_seconds"], seconds)
+            bucket = int(seconds * 1e9).bit_length()
+            operation["latency_ns"][bucket] = operation["latency_ns"].get(bucket, 0) + 1
+            if work is not None:
+                values = operation["metrics"].get(metric)
+                if values is None:
+                    values = operation["metrics"][metric] = {"total": 0, "max": 0}
+                values["total"] += work
+                values["max"] = max(values["max"], work)
+        if self.callback is not None:
+            event = {"operation": key, "seconds": seconds}
+            if work is not None:
+                event[metric] = work
+            self.callback(event)
 
-        return _is_valid(self.root, None, None)
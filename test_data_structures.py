@@ -1,3 +1,17 @@
+import asyncio
+import copy
+import io
+import itertools
+import multiprocessing
+import operator
+import os
+import pickle
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 
 import data_structures
@@ -17,6 +31,117 @@ class TestStaticArray(unittest.TestCase):
         self.array.set(4, 20)
         self.assertEqual(self.array.get(4), 20)
 
+    def test_typed_storage(self):
+        array = data_structures.StaticArray(4, dtype="i8")
+        self.assertEqual(array.get(3), 0)
+        array.set(1, -7)
+        self.assertEqual(array.get(1), -7)
+        self.assertEqual(array.buffer().nbytes, 32)
+        with self.assertRaises(IndexError):
+            array.set(4, 1)
+        with self.assertRaises(ValueError):
+            data_structures.StaticArray(4, dtype="x9")
+
+    def test_buffer_is_zero_copy(self):
+        array = data_structures.StaticArray(3, dtype="f8")
+        view = array.buffer()
+        view[2] = 1.5
+        self.assertEqual(array.get(2), 1.5)
+        array.set(0, 2.5)
+        self.assertEqual(view[0], 2.5)
+
+    def test_slices_are_views(self):
+        array = data_structures.StaticArray(6, dtype="i4")
+        for i in range(6):
+            array[i] = i
+        window = array[2:5]
+        self.assertEqual(len(window), 3)
+        self.assertEqual(list(window), [2, 3, 4])
+        window.set(0, 20)
+        self.assertEqual(array.get(2), 20)
+        self.assertEqual(list(array[::2]), [0, 20, 4])
+
+    def test_mmap_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "counters.bin")
+            array = data_structures.StaticArray.open_mmap(path, 1000, "u4")
+            array.set(999, 7)
+            array.flush()
+            array.close()
+
+            reopened = data_structures.StaticArray.open_mmap(path, readonly=True)
+            self.assertEqual(reopened.capacity, 1000)
+            self.assertEqual(reopened.dtype, "u4")
+            self.assertEqual(reopened.get(999), 7)
+            self.assertEqual(reopened.get(0), 0)
+            with self.assertRaises(TypeError):
+                reopened.set(0, 1)
+            reopened.close()
+
+            with self.assertRaises(ValueError):
+                data_structures.StaticArray.open_mmap(path, 10, "u4")
+
+    def test_bulk_operations(self):
+        array = data_structures.StaticArray(6, dtype="i8")
+        array.set_many([0, 2, 4], [30, 10, 20])
+        self.assertEqual(array.get_many([4, 0]), [20, 30])
+        array.fill(5, 5)
+        array[1:4:2] = [7, 8]
+        self.assertEqual(list(array), [30, 7, 10, 8, 20, 5])
+        self.assertEqual(array.argsort(), [5, 1, 3, 2, 4, 0])
+        self.assertEqual(array.reduce(operator.add), 80)
+        self.assertEqual(array.reduce(max), 30)
+        self.assertEqual(array.reduce(lambda a, b: a * b, 1), 30 * 7 * 10 * 8 * 20 * 5)
+        doubled = array.map(lambda v: v * 2)
+        self.assertEqual(doubled.dtype, "i8")
+        self.assertEqual(doubled.get(0), 60)
+        halves = array.map(lambda v: v / 2, dtype="f8")
+        self.assertEqual(halves.get(1), 3.5)
+        with self.assertRaises(IndexError):
+            array.get_many([6])
+        with self.assertRaises(ValueError):
+            array[0:2] = [1]
+
+    def test_mmap_rejects_foreign_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "other.bin")
+            with open(path, "wb") as file:
+                file.write(b"x" * 64)
+            with self.assertRaises(ValueError):
+                data_structures.StaticArray.open_mmap(path)
+            with self.assertRaises(FileNotFoundError):
+                data_structures.StaticArray.open_mmap(path + ".missing")
+            with open(path, "wb") as file:
+                file.write(b"SARR")
+            with self.assertRaises(ValueError):
+                data_structures.StaticArray.open_mmap(path)
+
+    def test_mmap_rejects_truncated_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "counters.bin")
+            data_structures.StaticArray.open_mmap(path, 100, "i8").close()
+            with open(path, "r+b") as file:
+                file.truncate(16 + 50 * 8)
+            with self.assertRaises(ValueError):
+                data_structures.StaticArray.open_mmap(path)
+
+    def test_mmap_close_with_live_views(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "counters.bin")
+            array = data_structures.StaticArray.open_mmap(path, 10, "i4")
+            view = array[2:5]
+            with self.assertRaises(BufferError):
+                array.close()
+            array.set(3, 9)
+            self.assertEqual(view.get(1), 9)
+            view.array.release()
+            exported = array.buffer()
+            with self.assertRaises(BufferError):
+                array.close()
+            exported.release()
+            array.close()
+            self.assertIsNone(array.mmap)
+
 
 class TestDynamicArray(unittest.TestCase):
     def setUp(self):
@@ -36,10 +161,94 @@ class TestDynamicArray(unittest.TestCase):
         self.array.delete(0)
         self.assertEqual(self.array.get(0), 10)
 
+    def test_bulk_operations(self):
+        self.array.extend([1, 3, 5, 7])
+        self.array[1:3] = [2, 3, 4]
+        self.assertEqual(list(self.array), [1, 2, 3, 4, 7])
+        self.assertEqual(self.array.searchsorted(4), 3)
+        self.assertEqual(self.array.searchsorted(4, side="right"), 4)
+        self.array.fill(0, 3)
+        self.assertEqual(self.array.get_many([0, 3, 4]), [1, 0, 0])
+        self.assertEqual(list(self.array[:2]), [1, 2])
+
+    def test_typed(self):
+        array = data_structures.DynamicArray(dtype="f4")
+        array.extend([1.5, 0.5])
+        array.insert(0, 2.5)
+        self.assertEqual(array.argsort(), [2, 1, 0])
+        self.assertEqual(array.reduce(min), 0.5)
+        self.assertEqual(list(array.map(lambda v: v * 2)), [5.0, 3.0, 1.0])
+
+    def test_untyped_reduce(self):
+        array = data_structures.DynamicArray()
+        array.extend(["a", "b", "c"])
+        self.assertEqual(array.reduce(operator.add), "abc")
+        array = data_structures.DynamicArray()
+        array.extend([[1], [2]])
+        self.assertEqual(array.reduce(operator.add), [1, 2])
+        self.assertEqual(array.reduce(lambda a, b: (a, b), None), ((None, [1]), [2]))
+
 
 import unittest
 
 
+class TestBlockedDynamicArray(unittest.TestCase):
+    def setUp(self):
+        self.array = data_structures.BlockedDynamicArray(load=4)
+
+    def test_append_insert_delete(self):
+        for value in range(10):
+            self.array.append(value)
+        self.array.insert(0, -1)
+        self.array.insert(5, 99)
+        self.array.delete(10)
+        self.assertEqual(list(self.array), [-1, 0, 1, 2, 3, 99, 4, 5, 6, 7, 9])
+        self.assertEqual(self.array.get(5), 99)
+        self.assertEqual(self.array.size(), 11)
+        with self.assertRaises(IndexError):
+            self.array.get(11)
+        with self.assertRaises(IndexError):
+            self.array.insert(12, 0)
+
+    def test_splice_and_delete_range(self):
+        self.array.extend(range(20))
+        self.array.splice(5, ["a", "b", "c"])
+        self.assertEqual(self.array.get(5), "a")
+        self.assertEqual(self.array.get(8), 5)
+        self.array.delete_range(3, 15)
+        self.assertEqual(list(self.array), [0, 1, 2, 12, 13, 14, 15, 16, 17, 18, 19])
+        self.array.delete_range(0, 11)
+        self.assertTrue(self.array.is_empty())
+
+    def test_matches_list(self):
+        rng = random.Random(7)
+        expected = []
+        for _ in range(2000):
+            index = rng.randint(0, len(expected))
+            if expected and rng.random() < 0.4:
+                index = min(index, len(expected) - 1)
+                self.array.delete(index)
+                del expected[index]
+            else:
+                self.array.insert(index, index)
+                expected.insert(index, index)
+        self.assertEqual(list(self.array), expected)
+        self.assertEqual(
+            [self.array.get(i) for i in range(len(expected))], expected
+        )
+
+    def test_unit_load_drops_empty_blocks(self):
+        array = data_structures.BlockedDynamicArray(load=1)
+        array.extend(range(10))
+        for index in (5, 0, 7, 3, 0):
+            array.delete(index)
+        self.assertEqual(list(array), [2, 3, 6, 7, 8])
+        self.assertNotIn([], array.blocks)
+        while array.size():
+            array.delete(0)
+        self.assertLessEqual(len(array.blocks), 1)
+
+
 class TestSinglyLinkedList(unittest.TestCase):
     def setUp(self):
         self.list = data_structures.SinglyLinkedList()
@@ -83,6 +292,34 @@ class TestSinglyLinkedList(unittest.TestCase):
         self.assertEqual(self.list.get_head().value, 2)
         self.assertEqual(self.list.get_tail().value, 1)
 
+    def test_insert_at_front_keeps_nodes(self):
+        self.list.append(1)
+        self.list.append(2)
+        self.list.insert(0, 0)
+        self.list.insert(3, 3)
+        self.assertEqual(self.list.size(), 4)
+        self.assertEqual(self.list.get_tail().value, 3)
+        self.assertEqual(self.list.find(2).next.value, 3)
+        with self.assertRaises(IndexError):
+            self.list.insert(6, 6)
+
+    def test_tail_and_size_track_mutations(self):
+        self.list.extend([1, 2, 3])
+        self.list.appendleft(0)
+        self.list.delete(3)
+        self.assertEqual(self.list.get_tail().value, 2)
+        self.list.append(4)
+        self.assertEqual(self.list.get_tail().value, 4)
+        self.assertEqual(self.list.size(), 4)
+        self.list.extend([])
+        self.list.reverse()
+        self.assertEqual(self.list.get_tail().value, 0)
+        for value in [0, 1, 2, 4]:
+            self.list.delete(value)
+        self.assertIsNone(self.list.get_tail())
+        self.assertEqual(self.list.size(), 0)
+        self.assertIsNone(self.list.find(5))
+
 
 class TestDoublyLinkedList(unittest.TestCase):
     def setUp(self):
@@ -109,6 +346,7 @@ class TestDoublyLinkedList(unittest.TestCase):
     def test_find(self):
         self.list.append(1)
         self.assertEqual(self.list.find(1).value, 1)
+        self.assertIsNone(self.list.find(2))
 
     def test_size(self):
         self.assertEqual(self.list.size(), 0)
@@ -128,6 +366,202 @@ class TestDoublyLinkedList(unittest.TestCase):
         self.assertEqual(self.list.get_tail().value, 1)
 
 
+class TestIndexedDoublyLinkedList(unittest.TestCase):
+    def setUp(self):
+        self.list = data_structures.DoublyLinkedList(indexed=True)
+
+    def test_find_and_delete(self):
+        for value in ["a", "b", "c", "b"]:
+            self.list.append(value)
+        self.assertIn("c", self.list)
+        self.assertNotIn("z", self.list)
+        self.assertIsNone(self.list.find("z"))
+        first_b = self.list.find("b")
+        self.assertIs(first_b.prev, self.list.get_head())
+        self.list.delete("b")
+        self.assertEqual(list(self.list), ["a", "c", "b"])
+        self.list.delete("b")
+        self.assertNotIn("b", self.list)
+        self.assertEqual(self.list.size(), 2)
+        self.assertEqual(self.list.index, {"a": {self.list.head: None}, "c": {self.list.tail: None}})
+
+    def test_duplicates_follow_list_order(self):
+        # 1 and 1.0 are equal keys, so the type shows which node was picked.
+        def apply(linked_list):
+            for value in ["a", 1, 1.0, "c"]:
+                linked_list.append(value)
+            linked_list.reverse()
+            linked_list.delete(1)
+            linked_list.appendleft(True)
+            linked_list.insert(0, 1)
+            linked_list.move_to_front(1.0)
+            linked_list.delete(True)
+            linked_list.move_to_back(1)
+            return [(type(value), value) for value in linked_list]
+
+        plain = apply(data_structures.DoublyLinkedList())
+        self.assertEqual(apply(self.list), plain)
+        node = self.list.get_head()
+        while node.value != 1:
+            node = node.next
+        self.assertIs(self.list.find(1.0), node)
+
+    def test_moves(self):
+        self.list.insert(0, 1)
+        self.list.insert(1, 2)
+        self.list.insert(1, 3)
+        self.assertEqual(list(self.list), [1, 3, 2])
+        self.list.move_to_front(2)
+        self.assertEqual(list(self.list), [2, 1, 3])
+        self.list.move_to_back(2)
+        self.assertEqual(list(self.list), [1, 3, 2])
+        self.list.reverse()
+        self.list.move_to_front(1)
+        self.assertEqual(list(self.list), [1, 2, 3])
+        self.assertEqual(self.list.get_tail().value, 3)
+        with self.assertRaises(KeyError):
+            self.list.move_to_back(9)
+
+    def test_node_handles(self):
+        self.list.append("a")
+        middle = self.list.insert_after(self.list.get_head(), "m")
+        last = self.list.insert_after(middle, "z")
+        self.list.insert_before(middle, "l")
+        self.assertEqual(list(self.list), ["a", "l", "m", "z"])
+        self.list.remove_node(middle)
+        self.list.remove_node(last)
+        self.assertEqual(list(self.list), ["a", "l"])
+        self.assertEqual(self.list.get_tail().value, "l")
+        self.assertIsNone(self.list.find("m"))
+        self.assertEqual(len(self.list), 2)
+
+
+class TestCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = data_structures.Cache(capacity=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("b", "missing"), "missing")
+        cache.put("a", 10)
+        cache.put("d", 4)
+        self.assertEqual(sorted(cache.entries), ["a", "d"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 2))
+
+    def test_lfu_eviction(self):
+        cache = data_structures.Cache(capacity=3, policy="lfu")
+        for key in "abc":
+            cache.put(key, key)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        cache.put("d", "d")  # c is the least frequently used
+        self.assertEqual(sorted(cache.entries), ["a", "b", "d"])
+        cache.put("e", "e")  # d is the only entry used once
+        self.assertEqual(sorted(cache.entries), ["a", "b", "e"])
+        cache.delete("e")
+        cache.get("b")
+        cache.put("f", "f")
+        cache.put("g", "g")  # f is the only entry used once
+        self.assertEqual(sorted(cache.entries), ["a", "b", "g"])
+
+    def test_max_bytes(self):
+        cache = data_structures.Cache(max_bytes=10, sizeof=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "yyyy")
+        cache.put("c", "zzzz")
+        self.assertEqual(sorted(cache.entries), ["b", "c"])
+        self.assertEqual(cache.stats()["bytes"], 8)
+        cache.put("d", "w" * 11)
+        self.assertNotIn("d", cache)
+
+    def test_rejects_non_positive_limits(self):
+        for kwargs in ({"capacity": 0}, {"capacity": -1}, {"max_bytes": 0}):
+            with self.assertRaises(ValueError):
+                data_structures.Cache(**kwargs)
+
+    def test_ttl(self):
+        cache = data_structures.Cache(ttl=0.05)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+        cache.put("b", 2)
+        time.sleep(0.06)
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertEqual(cache.stats()["expirations"], 2)
+        self.assertEqual(len(cache), 0)
+
+    def test_memoize(self):
+        calls = []
+
+        @data_structures.memoize(capacity=2)
+        def square(value, offset=0):
+            calls.append(value)
+            return value * value + offset
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3, offset=1), 10)
+        self.assertEqual(calls, [3, 3])
+        self.assertEqual(square.cache.stats()["hits"], 1)
+
+    def test_memoize_keeps_keyword_and_positional_keys_apart(self):
+        @data_structures.memoize()
+        def arguments(*args, **kwargs):
+            return args, kwargs
+
+        self.assertEqual(arguments(1, k=2), ((1,), {"k": 2}))
+        self.assertEqual(arguments((1,), (("k", 2),)), (((1,), (("k", 2),)), {}))
+        self.assertEqual(len(arguments.cache), 2)
+
+
+class TestCompactLinkedLists(unittest.TestCase):
+    def check_list(self, linked_list):
+        linked_list.extend([1, 2, 3])
+        linked_list.appendleft(0)
+        linked_list.insert(2, 9)
+        self.assertEqual(list(linked_list), [0, 1, 9, 2, 3])
+        linked_list.delete(0)
+        linked_list.delete(3)
+        linked_list.delete(42)
+        self.assertEqual(list(linked_list), [1, 9, 2])
+        self.assertEqual(linked_list.value(linked_list.get_head()), 1)
+        self.assertEqual(linked_list.value(linked_list.get_tail()), 2)
+        self.assertEqual(linked_list.value(linked_list.find(9)), 9)
+        self.assertIsNone(linked_list.find(0))
+        linked_list.append(4)  # reuses a freed slot
+        self.assertEqual(len(linked_list.values), 5)
+        linked_list.reverse()
+        self.assertEqual(list(linked_list), [4, 2, 9, 1])
+        self.assertEqual(linked_list.value(linked_list.get_tail()), 1)
+        linked_list.append(5)
+        self.assertEqual(list(linked_list), [4, 2, 9, 1, 5])
+        self.assertEqual(linked_list.size(), 5)
+        with self.assertRaises(IndexError):
+            linked_list.insert(7, 0)
+        for value in [4, 2, 9, 1, 5]:
+            linked_list.delete(value)
+        self.assertTrue(linked_list.is_empty())
+        self.assertIsNone(linked_list.get_head())
+
+    def test_singly(self):
+        self.check_list(data_structures.CompactSinglyLinkedList())
+
+    def test_doubly(self):
+        self.check_list(data_structures.CompactDoublyLinkedList())
+
+    def test_typed_values(self):
+        self.check_list(data_structures.CompactDoublyLinkedList(dtype="i4"))
+
+    def test_nodes_have_no_dict(self):
+        self.assertFalse(hasattr(data_structures.Node(1), "__dict__"))
+        self.assertFalse(hasattr(data_structures.DoubleNode(1), "__dict__"))
+
+
 class TestQueue(unittest.TestCase):
     def setUp(self):
         self.queue = data_structures.Queue()
@@ -141,11 +575,355 @@ class TestQueue(unittest.TestCase):
         self.queue.enqueue(2)
         self.assertEqual(self.queue.dequeue(), 1)
 
+    def test_dequeue_many_rejects_negative(self):
+        self.queue.enqueue_many(range(5))
+        with self.assertRaises(ValueError):
+            self.queue.dequeue_many(-1)
+        self.assertEqual(len(self.queue), 5)
+        self.assertEqual(self.queue.dequeue_many(0), [])
+        with self.assertRaises(ValueError):
+            data_structures.ConcurrentQueue().get_many(-1)
+        with self.assertRaises(ValueError):
+            asyncio.run(data_structures.AsyncQueue().get_many(-1))
+
     def test_is_empty(self):
         self.assertTrue(self.queue.is_empty())
         self.queue.enqueue(1)
         self.assertFalse(self.queue.is_empty())
 
+    def test_wraparound_and_growth(self):
+        expected = []
+        for i in range(1000):
+            self.queue.enqueue(i)
+            expected.append(i)
+            if i % 3 == 0:
+                self.assertEqual(self.queue.dequeue(), expected.pop(0))
+        self.assertEqual(self.queue.size(), len(expected))
+        while not self.queue.is_empty():
+            self.assertEqual(self.queue.dequeue(), expected.pop(0))
+        with self.assertRaises(IndexError):
+            self.queue.dequeue()
+
+    def test_batches(self):
+        self.queue.enqueue_many(range(5))
+        self.queue.dequeue_many(3)
+        self.queue.enqueue_many(range(5, 20))
+        self.assertEqual(self.queue.dequeue_many(4), [3, 4, 5, 6])
+        self.assertEqual(self.queue.dequeue_many(100), list(range(7, 20)))
+        self.assertEqual(self.queue.dequeue_many(1), [])
+
+    def test_maxsize_reject(self):
+        queue = data_structures.Queue(maxsize=2)
+        queue.enqueue(1)
+        queue.enqueue(2)
+        with self.assertRaises(IndexError):
+            queue.enqueue(3)
+        with self.assertRaises(IndexError):
+            queue.enqueue_many([3])
+        self.assertEqual(queue.dequeue_many(2), [1, 2])
+
+    def test_maxsize_overwrite(self):
+        queue = data_structures.Queue(maxsize=3, overwrite=True)
+        for i in range(5):
+            queue.enqueue(i)
+        self.assertEqual(queue.peek(), 2)
+        queue.enqueue_many([5, 6])
+        self.assertEqual(queue.dequeue_many(3), [4, 5, 6])
+        queue.enqueue_many(range(10))
+        self.assertEqual(queue.dequeue_many(3), [7, 8, 9])
+
+
+class TestPriorityQueue(unittest.TestCase):
+    def test_push_pop_order(self):
+        rng = random.Random(3)
+        for arity in (2, 3, 4, 8):
+            queue = data_structures.PriorityQueue(arity=arity)
+            priorities = [rng.randrange(1000) for _ in range(500)]
+            for priority in priorities:
+                queue.push(str(priority), priority)
+            self.assertEqual(queue.peek_priority(), min(priorities))
+            popped = [queue.pop() for _ in range(len(queue))]
+            self.assertEqual(popped, [str(priority) for priority in sorted(priorities)])
+            self.assertTrue(queue.is_empty())
+            with self.assertRaises(IndexError):
+                queue.pop()
+        with self.assertRaises(ValueError):
+            data_structures.PriorityQueue(arity=1)
+
+    def test_heapify_and_batches(self):
+        pairs = [(value, (value * 7919) % 1000) for value in range(1000)]
+        queue = data_structures.PriorityQueue.heapify(pairs, arity=4, dtype="i8")
+        self.assertEqual(queue.size(), 1000)
+        handles = queue.push_many([("a", -2), ("b", -1)])
+        self.assertEqual([queue.priority(handle) for handle in handles], [-2, -1])
+        self.assertEqual(queue.pop_many(3), ["a", "b", 0])
+        self.assertEqual(len(queue.pop_many(5000)), 999)
+        self.assertEqual(queue.pop_many(1), [])
+        with self.assertRaises(ValueError):
+            queue.pop_many(-1)
+
+    def test_push_many_is_atomic(self):
+        for dtype, batch in [
+            (None, [("a", 2), ("b",)]),
+            ("f8", [("a", 2), ("b", "x")]),
+        ]:
+            queue = data_structures.PriorityQueue(dtype=dtype)
+            queue.push("c", 1)
+            with self.assertRaises((ValueError, TypeError)):
+                queue.push_many(batch)
+            self.assertEqual(queue.size(), 1)
+            self.assertEqual(len(queue.priorities), len(queue.handles))
+            self.assertEqual(queue.pop_many(5), ["c"])
+
+    def test_decrease_key_and_remove(self):
+        queue = data_structures.PriorityQueue(arity=3)
+        handles = {value: queue.push(value, value) for value in range(100)}
+        queue.decrease_key(handles[70], -1)
+        self.assertEqual(queue.remove(handles[10]), 10)
+        self.assertEqual(queue.remove(handles[99]), 99)
+        self.assertNotIn(handles[10], queue)
+        with self.assertRaises(KeyError):
+            queue.remove(handles[10])
+        with self.assertRaises(ValueError):
+            queue.decrease_key(handles[5], 50)
+        self.assertEqual(queue.pop(), 70)
+        self.assertNotIn(handles[70], queue)
+        expected = [value for value in range(100) if value not in (10, 70, 99)]
+        self.assertEqual(queue.pop_many(100), expected)
+
+    def test_random_operations(self):
+        rng = random.Random(11)
+        queue = data_structures.PriorityQueue(arity=4)
+        live = {}
+        for step in range(3000):
+            action = rng.random()
+            if action < 0.5 or not live:
+                live[step] = rng.randrange(1000)
+                handle = queue.push(step, live[step])
+                live[step] = (live[step], handle)
+            elif action < 0.7:
+                value = rng.choice(list(live))
+                priority, handle = live[value]
+                queue.decrease_key(handle, priority - rng.randrange(100))
+                live[value] = (queue.priority(handle), handle)
+            elif action < 0.85:
+                value = rng.choice(list(live))
+                self.assertEqual(queue.remove(live.pop(value)[1]), value)
+            else:
+                smallest = min(priority for priority, _ in live.values())
+                self.assertEqual(queue.peek_priority(), smallest)
+                self.assertEqual(live.pop(queue.pop())[0], smallest)
+            self.assertEqual(len(queue), len(live))
+
+    def test_snapshot_and_memory(self):
+        queue = data_structures.PriorityQueue.heapify((str(i), 100 - i) for i in range(100))
+        buffer = io.BytesIO()
+        queue.dump(buffer)
+        buffer.seek(0)
+        restored = data_structures.PriorityQueue.load(buffer)
+        self.assertEqual(restored.pop_many(100), [str(i) for i in range(99, -1, -1)])
+        report = queue.memory_usage()
+        self.assertEqual(report["elements"], 100)
+        self.assertGreater(report["nodes"], 0)
+
+
+class TestConcurrentQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = data_structures.ConcurrentQueue(maxsize=16)
+
+    def test_put_get(self):
+        self.queue.put(1)
+        self.queue.put_many([2, 3])
+        self.assertEqual(self.queue.get(), 1)
+        self.assertEqual(self.queue.get_many(10), [2, 3])
+        self.assertTrue(self.queue.is_empty())
+
+    def test_timeouts(self):
+        with self.assertRaises(TimeoutError):
+            self.queue.get(timeout=0.01)
+        self.queue.put_many(range(16))
+        with self.assertRaises(TimeoutError):
+            self.queue.put(16, timeout=0.01)
+
+    def test_put_many_reports_partial_batch(self):
+        self.queue.put(0)
+        with self.assertRaises(TimeoutError) as caught:
+            self.queue.put_many(range(1, 21), timeout=0.01)
+        self.assertEqual(caught.exception.enqueued, 15)
+        self.assertEqual(self.queue.get_many(20), list(range(16)))
+        self.queue.close()
+        with self.assertRaises(data_structures.QueueClosed) as caught:
+            self.queue.put_many([1])
+        self.assertEqual(caught.exception.enqueued, 0)
+
+    def test_close(self):
+        self.queue.put(1)
+        self.queue.close()
+        with self.assertRaises(data_structures.QueueClosed):
+            self.queue.put(2)
+        self.assertEqual(self.queue.get(), 1)
+        with self.assertRaises(data_structures.QueueClosed):
+            self.queue.get()
+
+    def test_producers_consumers(self):
+        received = []
+        lock = threading.Lock()
+
+        def produce(start):
+            for value in range(start, start + 500):
+                self.queue.put(value)
+
+        def consume():
+            for batch in iter(lambda: self._get_batch(), None):
+                with lock:
+                    received.extend(batch)
+
+        producers = [threading.Thread(target=produce, args=(i * 500,)) for i in range(4)]
+        consumers = [threading.Thread(target=consume) for _ in range(3)]
+        for thread in producers + consumers:
+            thread.start()
+        for thread in producers:
+            thread.join()
+        self.queue.close()
+        for thread in consumers:
+            thread.join()
+        self.assertEqual(sorted(received), list(range(2000)))
+
+    def _get_batch(self):
+        try:
+            return self.queue.get_many(32)
+        except data_structures.QueueClosed:
+            return None
+
+
+class TestAsyncQueue(unittest.TestCase):
+    def test_put_get(self):
+        async def run():
+            queue = data_structures.AsyncQueue()
+            await queue.put(1)
+            await queue.put_many([2, 3, 4])
+            self.assertEqual(await queue.get(), 1)
+            self.assertEqual(await queue.get_many(2), [2, 3])
+            self.assertEqual(queue.size(), 1)
+
+        asyncio.run(run())
+
+    def test_get_waits_for_put(self):
+        async def run():
+            queue = data_structures.AsyncQueue()
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.sleep(0)
+            self.assertFalse(getter.done())
+            await queue.put(7)
+            self.assertEqual(await getter, 7)
+
+        asyncio.run(run())
+
+    def test_cancelled_getter_passes_wakeup_on(self):
+        async def run():
+            queue = data_structures.AsyncQueue()
+            first = asyncio.ensure_future(queue.get())
+            second = asyncio.ensure_future(queue.get())
+            await asyncio.sleep(0)
+            await queue.put(1)
+            first.cancel()
+            self.assertEqual(await asyncio.wait_for(second, 1), 1)
+            self.assertTrue(first.cancelled())
+
+        asyncio.run(run())
+
+    def test_cancelled_putter_passes_wakeup_on(self):
+        async def run():
+            queue = data_structures.AsyncQueue(high_watermark=2, low_watermark=0)
+            await queue.put_many([0, 1])
+            first = asyncio.ensure_future(queue.put(2))
+            second = asyncio.ensure_future(queue.put(3))
+            await asyncio.sleep(0)
+            self.assertEqual(await queue.get_many(2), [0, 1])
+            first.cancel()
+            await asyncio.wait_for(second, 1)
+            self.assertEqual(await queue.get(), 3)
+
+        asyncio.run(run())
+
+    def test_watermarks(self):
+        async def run():
+            queue = data_structures.AsyncQueue(high_watermark=4, low_watermark=1)
+            await queue.put_many(range(4))
+            self.assertTrue(queue.paused)
+            putter = asyncio.ensure_future(queue.put(4))
+            await asyncio.sleep(0)
+            self.assertFalse(putter.done())
+            await queue.get_many(2)
+            await asyncio.sleep(0)
+            self.assertFalse(putter.done())
+            await queue.get()
+            await putter
+            self.assertFalse(queue.paused)
+            self.assertEqual(await queue.get_many(10), [3, 4])
+
+        asyncio.run(run())
+
+    def test_async_iteration_and_close(self):
+        async def run():
+            queue = data_structures.AsyncQueue(high_watermark=8)
+
+            async def produce():
+                for value in range(100):
+                    await queue.put(value)
+                queue.close()
+
+            producer = asyncio.ensure_future(produce())
+            received = [value async for value in queue]
+            await producer
+            self.assertEqual(received, list(range(100)))
+            with self.assertRaises(data_structures.QueueClosed):
+                await queue.put(1)
+
+        asyncio.run(run())
+
+
+def _fill_shared_queue(queue, start, stop):
+    queue.enqueue_many(range(start, stop))
+    queue.close()
+
+
+class TestSharedMemoryQueue(unittest.TestCase):
+    def setUp(self):
+        self.queue = data_structures.SharedMemoryQueue(8, dtype="i8")
+
+    def tearDown(self):
+        self.queue.close()
+        self.queue.unlink()
+
+    def test_enqueue_dequeue(self):
+        self.queue.enqueue(1)
+        self.queue.enqueue(2)
+        self.assertEqual(self.queue.peek(), 1)
+        self.assertEqual(self.queue.dequeue(), 1)
+        self.assertEqual(self.queue.size(), 1)
+        self.assertEqual(self.queue.dequeue(), 2)
+        self.assertTrue(self.queue.is_empty())
+        with self.assertRaises(IndexError):
+            self.queue.dequeue()
+
+    def test_batches_wrap_around(self):
+        self.queue.enqueue_many(range(6))
+        self.assertEqual(self.queue.dequeue_many(5).tolist(), [0, 1, 2, 3, 4])
+        self.queue.enqueue_many(range(6, 13))
+        with self.assertRaises(IndexError):
+            self.queue.enqueue_many([13])
+        self.assertEqual(self.queue.dequeue_many(100).tolist(), list(range(5, 13)))
+
+    def test_cross_process(self):
+        process = multiprocessing.Process(
+            target=_fill_shared_queue, args=(self.queue, 100, 105)
+        )
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.queue.dequeue_many(10).tolist(), [100, 101, 102, 103, 104])
+
 
 class TestBinarySearchTree(unittest.TestCase):
     def setUp(self):
@@ -217,6 +995,604 @@ class TestBinarySearchTree(unittest.TestCase):
             self.bst.insert(value)
         self.assertTrue(self.bst.is_valid_bst())
 
+    def test_height_after_delete(self):
+        for value in [5, 3, 7, 2, 4, 1]:
+            self.bst.insert(value)
+        self.assertEqual(self.bst.height(), 4)
+        self.bst.delete(1)
+        self.assertEqual(self.bst.height(), 3)
+        self.bst.delete(5)
+        self.assertEqual(self.bst.height(), 3)
+        self.assertEqual(self.bst.inorder_traversal(), [2, 3, 4, 7])
+
+    def test_size_after_delete(self):
+        for value in [5, 3, 7, 2, 4, 6, 8]:
+            self.bst.insert(value)
+        self.bst.insert(4)
+        self.bst.delete(5)  # two children, successor path
+        self.bst.delete(2)
+        self.bst.delete(42)
+        self.assertEqual(self.bst.size(), 5)
+        self.assertEqual(self.bst.root.size, 5)
+
+    def test_rank_select(self):
+        values = [5, 3, 7, 2, 4, 6, 8]
+        for value in values:
+            self.bst.insert(value)
+        for k, value in enumerate(sorted(values)):
+            self.assertEqual(self.bst.select(k).value, value)
+            self.assertEqual(self.bst.rank(value), k)
+        self.assertEqual(self.bst.rank(1), 0)
+        self.assertEqual(self.bst.rank(100), 7)
+        with self.assertRaises(IndexError):
+            self.bst.select(7)
+
+    def test_count_range(self):
+        for value in [5, 3, 7, 2, 4, 6, 8]:
+            self.bst.insert(value)
+        self.assertEqual(self.bst.count_range(3, 6), 4)
+        self.assertEqual(self.bst.count_range(0, 100), 7)
+        self.assertEqual(self.bst.count_range(6, 3), 0)
+        self.assertEqual(self.bst.count_range(9, 12), 0)
+
+    def test_iterators(self):
+        values = [5, 3, 7, 2, 4, 6, 8]
+        for value in values:
+            self.bst.insert(value)
+        self.assertEqual(list(self.bst), sorted(values))
+        self.assertEqual(list(self.bst.iter_preorder()), [5, 3, 2, 4, 7, 6, 8])
+        self.assertEqual(list(self.bst.iter_postorder()), [2, 4, 3, 6, 8, 7, 5])
+        self.assertEqual(list(self.bst.iter_level_order()), [5, 3, 7, 2, 4, 6, 8])
+        self.assertEqual(list(itertools.islice(self.bst.iter_inorder(), 3)), [2, 3, 4])
+
+    def test_neighbors(self):
+        for value in [50, 30, 70, 20, 40, 60, 80]:
+            self.bst.insert(value)
+        self.assertEqual(self.bst.floor(45).value, 40)
+        self.assertEqual(self.bst.floor(40).value, 40)
+        self.assertIsNone(self.bst.floor(10))
+        self.assertEqual(self.bst.ceiling(45).value, 50)
+        self.assertEqual(self.bst.ceiling(50).value, 50)
+        self.assertIsNone(self.bst.ceiling(81))
+        self.assertEqual(self.bst.predecessor(50).value, 40)
+        self.assertIsNone(self.bst.predecessor(20))
+        self.assertEqual(self.bst.successor(50).value, 60)
+        self.assertEqual(self.bst.successor(55).value, 60)
+        self.assertIsNone(self.bst.successor(80))
+
+    def test_range(self):
+        for value in [50, 30, 70, 20, 40, 60, 80]:
+            self.bst.insert(value)
+        self.assertEqual(list(self.bst.range(30, 60)), [30, 40, 50, 60])
+        self.assertEqual(list(self.bst.range(31, 59)), [40, 50])
+        self.assertEqual(list(self.bst.range(0, 100)), [20, 30, 40, 50, 60, 70, 80])
+        self.assertEqual(list(self.bst.range(61, 69)), [])
+        self.assertEqual(list(self.bst.range(81, 100)), [])
+        right_leaning = data_structures.BinarySearchTree()
+        for value in [1, 2, 3]:
+            right_leaning.insert(value)
+        self.assertEqual(list(right_leaning.range(5, 10)), [])
+        self.assertEqual(list(right_leaning.range(3, 10)), [3])
+        self.assertEqual(list(data_structures.BinarySearchTree().range(0, 1)), [])
+
+    def test_from_sorted(self):
+        bst = data_structures.BinarySearchTree.from_sorted([1, 2, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(bst.inorder_traversal(), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(bst.height(), 3)
+        self.assertEqual(bst.size(), 7)
+        self.assertEqual(bst.select(3).value, 4)
+        bst.insert(8)
+        self.assertEqual(bst.height(), 4)
+        with self.assertRaises(ValueError):
+            data_structures.BinarySearchTree.from_sorted([1, 3, 2])
+
+    def test_insert_many(self):
+        self.bst.insert(10)
+        self.bst.insert_many([5, 20, 5, 15])  # small batch, single inserts
+        self.assertEqual(self.bst.inorder_traversal(), [5, 10, 15, 20])
+        self.bst.insert_many(range(100, 0, -1))  # large batch, rebuild
+        self.assertEqual(self.bst.inorder_traversal(), list(range(1, 101)))
+        self.assertEqual(self.bst.size(), 100)
+        self.assertEqual(self.bst.height(), 7)
+        self.assertTrue(self.bst.is_valid_bst())
+
+    def test_deep_tree_without_recursion(self):
+        for value in range(2000):
+            self.bst.insert(value)
+        self.assertEqual(self.bst.height(), 2000)
+        self.assertEqual(self.bst.inorder_traversal(), list(range(2000)))
+        self.assertEqual(self.bst.postorder_traversal(), list(range(1999, -1, -1)))
+        self.assertEqual(len(self.bst.preorder_traversal()), 2000)
+        self.assertTrue(self.bst.is_valid_bst())
+
+
+class TestBalancedBinarySearchTree(unittest.TestCase):
+    def setUp(self):
+        self.bst = data_structures.BinarySearchTree(balanced=True)
+
+    def test_sorted_insert_stays_balanced(self):
+        for value in range(1023):
+            self.bst.insert(value)
+        self.assertEqual(self.bst.height(), 10)
+        self.assertEqual(self.bst.inorder_traversal(), list(range(1023)))
+        self.assertTrue(self.bst.is_valid_bst())
+
+    def test_delete_stays_balanced(self):
+        for value in range(1000):
+            self.bst.insert(value)
+        for value in range(0, 1000, 3):
+            self.bst.delete(value)
+        remaining = [v for v in range(1000) if v % 3]
+        self.assertEqual(self.bst.inorder_traversal(), remaining)
+        self.assertLessEqual(self.bst.height(), 11)
+        self.assertIsNone(self.bst.search(300))
+        self.assertEqual(self.bst.search(301).value, 301)
+        self.assertEqual(self.bst.size(), len(remaining))
+        self.assertEqual(self.bst.select(100).value, remaining[100])
+        self.assertEqual(self.bst.rank(500), remaining.index(500))
+
+
+class TestPersistentBinarySearchTree(unittest.TestCase):
+    def nodes(self, tree):
+        stack = [tree.root] if tree.root is not None else []
+        seen = set()
+        while stack:
+            node = stack.pop()
+            seen.add(id(node))
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+        return seen
+
+    def test_snapshots_are_unaffected(self):
+        tree = data_structures.PersistentBinarySearchTree()
+        for value in range(100):
+            tree.insert(value)
+        snapshot = tree.snapshot()
+        for value in range(0, 100, 2):
+            tree.delete(value)
+        tree.insert(1000)
+        self.assertEqual(snapshot.inorder_traversal(), list(range(100)))
+        self.assertEqual(snapshot.size(), 100)
+        self.assertEqual(tree.inorder_traversal(), list(range(1, 100, 2)) + [1000])
+        self.assertLessEqual(tree.height(), 8)
+
+    def test_updates_share_structure(self):
+        tree = data_structures.PersistentBinarySearchTree.from_sorted(range(1023))
+        self.assertTrue(tree.balanced)
+        snapshot = tree.snapshot()
+        # Sorted inserts stay balanced, so each copies only O(log n) nodes.
+        for value in range(2000, 2100):
+            before = self.nodes(tree)
+            tree.insert(value)
+            self.assertLessEqual(len(self.nodes(tree) - before), 2 * tree.height())
+        self.assertLessEqual(tree.height(), 12)
+        before = self.nodes(tree)
+        tree.delete(511)
+        self.assertLessEqual(len(self.nodes(tree) - before), 4 * tree.height())
+        self.assertEqual(len(self.nodes(snapshot)), 1023)
+        self.assertEqual(snapshot.select(511).value, 511)
+
+    def test_random_operations(self):
+        rng = random.Random(7)
+        for balanced in (True, False):
+            tree = data_structures.PersistentBinarySearchTree(balanced=balanced)
+            versions = []
+            expected = set()
+            for _ in range(500):
+                value = rng.randrange(100)
+                if rng.random() < 0.6:
+                    tree.insert(value)
+                    expected.add(value)
+                else:
+                    tree.delete(value)
+                    expected.discard(value)
+                versions.append((tree.snapshot(), sorted(expected)))
+            for snapshot, values in versions:
+                self.assertEqual(snapshot.inorder_traversal(), values)
+                self.assertEqual(snapshot.size(), len(values))
+                self.assertTrue(snapshot.is_valid_bst())
+            self.assertEqual(tree.rank(50), sum(1 for value in expected if value < 50))
+
+
+class TestBTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = data_structures.BTree(fanout=4)
+
+    def test_insert_search(self):
+        self.tree.insert(5, "five")
+        self.assertIsNotNone(self.tree.search(5))
+        self.assertIsNone(self.tree.search(6))
+        self.assertEqual(self.tree.get(5), "five")
+        self.tree.insert(5, "FIVE")
+        self.assertEqual(self.tree.get(5), "FIVE")
+        self.assertEqual(self.tree.size(), 1)
+
+    def test_random_insert_delete(self):
+        rng = random.Random(42)
+        expected = set()
+        for _ in range(3000):
+            key = rng.randrange(500)
+            if rng.random() < 0.6:
+                self.tree.insert(key)
+                expected.add(key)
+            else:
+                self.tree.delete(key)
+                expected.discard(key)
+        self.assertEqual(self.tree.inorder_traversal(), sorted(expected))
+        self.assertEqual(self.tree.size(), len(expected))
+        for key in range(500):
+            self.assertEqual(key in self.tree, key in expected)
+
+    def test_delete_all(self):
+        for key in range(200):
+            self.tree.insert(key)
+        self.assertLessEqual(self.tree.height(), 8)
+        for key in range(200):
+            self.tree.delete(key)
+        self.assertTrue(self.tree.is_empty())
+        self.assertEqual(self.tree.inorder_traversal(), [])
+        self.assertIsNone(self.tree.minimum())
+
+    def test_minimum_maximum_range(self):
+        for key in range(0, 100, 5):
+            self.tree.insert(key)
+        self.assertEqual(self.tree.minimum(), 0)
+        self.assertEqual(self.tree.maximum(), 95)
+        self.assertEqual(list(self.tree.range(12, 31)), [15, 20, 25, 30])
+        self.assertEqual(list(self.tree.range(90, 200)), [90, 95])
+        self.assertEqual(list(self.tree.range(41, 44)), [])
+
+    def test_level_order_traversal(self):
+        for key in range(5):
+            self.tree.insert(key)
+        self.assertEqual(self.tree.level_order_traversal(), [[2], [0, 1], [2, 3, 4]])
+
+    def test_preorder_postorder_traversal(self):
+        self.assertEqual(self.tree.preorder_traversal(), [])
+        for key in range(12):
+            self.tree.insert(key)
+        self.assertEqual(
+            self.tree.preorder_traversal(),
+            [[4], [2], [0, 1], [2, 3], [6, 8], [4, 5], [6, 7], [8, 9, 10, 11]],
+        )
+        self.assertEqual(
+            self.tree.postorder_traversal(),
+            [[0, 1], [2, 3], [2], [4, 5], [6, 7], [8, 9, 10, 11], [6, 8], [4]],
+        )
+
+
+class TestSkipList(unittest.TestCase):
+    def setUp(self):
+        self.skip_list = data_structures.SkipList(seed=1)
+
+    def test_insert_search_delete(self):
+        for value in [5, 3, 7, 2, 4, 6, 8, 5]:
+            self.skip_list.insert(value)
+        self.assertEqual(self.skip_list.size(), 7)
+        self.assertEqual(self.skip_list.search(4).value, 4)
+        self.skip_list.delete(4)
+        self.skip_list.delete(40)
+        self.assertIsNone(self.skip_list.search(4))
+        self.assertNotIn(4, self.skip_list)
+        self.assertEqual(self.skip_list.inorder_traversal(), [2, 3, 5, 6, 7, 8])
+        self.assertEqual(self.skip_list.minimum().value, 2)
+        self.assertEqual(self.skip_list.maximum().value, 8)
+        self.assertEqual(list(self.skip_list.range(3, 6)), [3, 5, 6])
+
+    def test_empty(self):
+        self.assertTrue(self.skip_list.is_empty())
+        self.assertIsNone(self.skip_list.minimum())
+        self.assertIsNone(self.skip_list.maximum())
+        self.assertEqual(list(self.skip_list), [])
+
+    def test_matches_set(self):
+        rng = random.Random(5)
+        expected = set()
+        for _ in range(3000):
+            value = rng.randrange(300)
+            if rng.random() < 0.6:
+                self.skip_list.insert(value)
+                expected.add(value)
+            else:
+                self.skip_list.delete(value)
+                expected.discard(value)
+        self.assertEqual(list(self.skip_list), sorted(expected))
+        self.assertEqual(len(self.skip_list), len(expected))
+
+    def test_readers_during_writes(self):
+        for value in range(0, 1000, 2):
+            self.skip_list.insert(value)
+        evens = set(range(100, 901, 2))
+        errors = []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                values = list(self.skip_list.range(100, 900))
+                if values != sorted(set(values)) or not evens <= set(values):
+                    errors.append(values)
+                if self.skip_list.search(500) is None:
+                    errors.append(500)
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        for value in range(1, 1000, 2):
+            self.skip_list.insert(value)
+            self.skip_list.delete(value)
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.skip_list.size(), 500)
+
+
+class TestSnapshots(unittest.TestCase):
+    def round_trip(self, structure):
+        buffer = io.BytesIO()
+        structure.dump(buffer)
+        buffer.seek(0)
+        return type(structure).load(buffer)
+
+    def test_arrays(self):
+        static_array = data_structures.StaticArray(4, dtype="f8")
+        static_array.set(2, 2.5)
+        restored = self.round_trip(static_array)
+        self.assertEqual(list(restored), [0.0, 0.0, 2.5, 0.0])
+        self.assertEqual(restored.dtype, "f8")
+        untyped = data_structures.StaticArray(3)
+        untyped.set(0, "x")
+        self.assertEqual(list(self.round_trip(untyped)), ["x", None, None])
+        dynamic_array = data_structures.DynamicArray(dtype="i2")
+        dynamic_array.extend([1, -2, 3])
+        self.assertEqual(list(self.round_trip(dynamic_array)), [1, -2, 3])
+        blocked = data_structures.BlockedDynamicArray(load=2)
+        blocked.extend(range(7))
+        self.assertEqual(list(self.round_trip(blocked)), list(range(7)))
+
+    def test_lists_and_queue(self):
+        for cls in (
+            data_structures.SinglyLinkedList,
+            data_structures.DoublyLinkedList,
+            data_structures.CompactSinglyLinkedList,
+            data_structures.CompactDoublyLinkedList,
+        ):
+            linked_list = cls()
+            for value in [3, 1, 2**70, "four"]:
+                linked_list.append(value)
+            self.assertEqual(list(self.round_trip(linked_list)), [3, 1, 2**70, "four"])
+        queue = data_structures.Queue(maxsize=5, overwrite=True)
+        queue.enqueue_many(range(8))
+        restored = self.round_trip(queue)
+        self.assertEqual(restored.dequeue_many(10), [3, 4, 5, 6, 7])
+        self.assertTrue(restored.overwrite)
+
+    def test_ordered_structures(self):
+        bst = data_structures.BinarySearchTree()
+        for value in range(1000):
+            bst.insert(value)
+        restored = self.round_trip(bst)
+        self.assertEqual(restored.inorder_traversal(), list(range(1000)))
+        self.assertEqual(restored.height(), 10)
+        btree = data_structures.BTree(fanout=4)
+        for key in range(100):
+            btree.insert(key, str(key))
+        restored = self.round_trip(btree)
+        self.assertEqual(list(restored.items()), [(k, str(k)) for k in range(100)])
+        restored.delete(50)
+        restored.insert(1000)
+        self.assertEqual(restored.size(), 100)
+        self.assertEqual(restored.maximum(), 1000)
+        skip_list = data_structures.SkipList()
+        for value in [0.5, 1.5, -1.0]:
+            skip_list.insert(value)
+        self.assertEqual(list(self.round_trip(skip_list)), [-1.0, 0.5, 1.5])
+
+    def test_errors(self):
+        buffer = io.BytesIO()
+        data_structures.Queue().dump(buffer)
+        buffer.seek(0)
+        with self.assertRaises(ValueError):
+            data_structures.BinarySearchTree.load(buffer)
+        with self.assertRaises(ValueError):
+            data_structures.Queue.load(io.BytesIO(b"garbage"))
+
+    def test_copy_semantics(self):
+        payload = ["shared"]
+        linked_list = data_structures.SinglyLinkedList()
+        linked_list.append(payload)
+        self.assertIs(next(iter(copy.copy(linked_list))), payload)
+        deep = copy.deepcopy(linked_list)
+        self.assertEqual(list(deep), [payload])
+        self.assertIsNot(next(iter(deep)), payload)
+        static_array = data_structures.StaticArray(3, dtype="i4")
+        static_array.set(1, 5)
+        clone = copy.deepcopy(static_array)
+        clone.set(1, 6)
+        self.assertEqual(static_array.get(1), 5)
+        skip_list = data_structures.SkipList()
+        skip_list.insert(2)
+        clone = copy.deepcopy(skip_list)
+        clone.insert(1)
+        self.assertEqual(list(skip_list), [2])
+
+    def test_blocked_array_load_is_not_shadowed(self):
+        blocked = data_structures.BlockedDynamicArray(load=3)
+        blocked.extend(range(10))
+        buffer = io.BytesIO()
+        blocked.dump(buffer)
+        buffer.seek(0)
+        restored = blocked.load(buffer)
+        self.assertEqual(list(restored), list(range(10)))
+        self.assertEqual(restored.block_load, 3)
+
+    def test_pickle_out_of_band(self):
+        dynamic_array = data_structures.DynamicArray(dtype="i8")
+        dynamic_array.extend(range(1000))
+        buffers = []
+        data = pickle.dumps(dynamic_array, protocol=5, buffer_callback=buffers.append)
+        self.assertEqual(len(buffers), 1)
+        self.assertLess(len(data), 200)
+        restored = pickle.loads(data, buffers=buffers)
+        self.assertEqual(list(restored), list(range(1000)))
+        bst = data_structures.BinarySearchTree()
+        for value in range(2000):
+            bst.insert(value)
+        self.assertEqual(pickle.loads(pickle.dumps(bst)).size(), 2000)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_class_counters_and_probes(self):
+        search = data_structures.BinarySearchTree.search
+        with data_structures.Instrumentation() as instrumentation:
+            instrumentation.attach(data_structures.BinarySearchTree)
+            tree = data_structures.BinarySearchTree()
+            for value in [4, 2, 6, 1, 3]:
+                tree.insert(value)
+            tree.search(3)
+            tree.search(1)
+            stats = instrumentation.stats()
+        self.assertIs(data_structures.BinarySearchTree.search, search)
+        self.assertEqual(stats["BinarySearchTree.insert"]["calls"], 5)
+        self.assertEqual(stats["BinarySearchTree.search"]["calls"], 2)
+        self.assertEqual(stats["BinarySearchTree.search"]["nodes_visited"], {"total": 6, "max": 3})
+        self.assertEqual(sum(stats["BinarySearchTree.search"]["latency_ns"].values()), 2)
+        self.assertNotIn("BinarySearchTree.iter_inorder", stats)
+        tree.search(3)
+        self.assertEqual(instrumentation.stats()["BinarySearchTree.search"]["calls"], 2)
+
+    def test_instance_and_callback(self):
+        events = []
+        instrumentation = data_structures.Instrumentation(callback=events.append)
+        linked_list = data_structures.DoublyLinkedList()
+        other = data_structures.DoublyLinkedList()
+        for value in range(10):
+            linked_list.append(value)
+        instrumentation.attach(linked_list, ["find", "delete"])
+        linked_list.find(7)
+        linked_list.delete(20)
+        other.find(1)
+        instrumentation.detach()
+        # delete() scans through find(), which is reported on its own too,
+        # but only the outer call is probed.
+        self.assertEqual(
+            [event["operation"] for event in events],
+            ["DoublyLinkedList.find", "DoublyLinkedList.find", "DoublyLinkedList.delete"],
+        )
+        self.assertEqual(
+            [event.get("nodes_visited") for event in events], [8, None, 10]
+        )
+        self.assertNotIn("find", vars(linked_list))
+        instrumentation.reset()
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_queue_depth_and_errors(self):
+        queue = data_structures.Queue()
+        instrumentation = data_structures.Instrumentation()
+        instrumentation.attach(queue, ["enqueue", "dequeue"])
+        with self.assertRaises(ValueError):
+            instrumentation.attach(queue, ["enqueue"])
+        for value in range(3):
+            queue.enqueue(value)
+        queue.dequeue()
+        with self.assertRaises(IndexError):
+            queue.dequeue()
+            queue.dequeue()
+            queue.dequeue()
+        stats = instrumentation.stats()
+        instrumentation.detach()
+        self.assertEqual(stats["Queue.enqueue"]["queue_depth"], {"total": 3, "max": 2})
+        self.assertEqual(stats["Queue.dequeue"]["calls"], 4)
+
+    def test_keyword_arguments(self):
+        for cls in (data_structures.SinglyLinkedList, data_structures.DoublyLinkedList):
+            linked_list = cls()
+            with data_structures.Instrumentation() as instrumentation:
+                instrumentation.attach(cls, ["insert", "find"])
+                linked_list.insert(0, value=5)
+                linked_list.insert(position=1, value=2)
+                self.assertEqual(linked_list.find(value=2).value, 2)
+                with self.assertRaises(TypeError):
+                    linked_list.insert(0, 1, 2)
+                stats = instrumentation.stats()
+            self.assertEqual(list(linked_list), [5, 2])
+            self.assertEqual(
+                stats[f"{cls.__name__}.insert"]["nodes_visited"], {"total": 1, "max": 1}
+            )
+            self.assertEqual(
+                stats[f"{cls.__name__}.find"]["nodes_visited"], {"total": 2, "max": 2}
+            )
+
+    def test_probe_calls_are_not_recorded(self):
+        tree = data_structures.BTree(fanout=4)
+        with data_structures.Instrumentation() as instrumentation:
+            instrumentation.attach(tree)
+            for value in range(20):
+                tree.insert(value)
+            stats = instrumentation.stats()
+        self.assertNotIn("BTree.height", stats)
+        self.assertEqual(stats["BTree.insert"]["calls"], 20)
+        self.assertEqual(stats["BTree.insert"]["nodes_visited"]["max"], tree.height())
+
+
+class TestMemoryUsage(unittest.TestCase):
+    def test_breakdown(self):
+        values = [10**6 + i for i in range(100)]
+        linked_list = data_structures.DoublyLinkedList()
+        for value in values:
+            linked_list.append(value)
+        report = linked_list.memory_usage()
+        self.assertEqual(report["elements"], 100)
+        self.assertEqual(report["nodes"], 100 * sys.getsizeof(linked_list.head))
+        self.assertEqual(report["payload"], sum(map(sys.getsizeof, values)))
+        self.assertEqual(report["total"], report["container"] + report["nodes"] + report["payload"])
+        self.assertEqual(linked_list.memory_usage(deep=False)["payload"], 0)
+        self.assertAlmostEqual(
+            report["overhead_per_element"],
+            (report["container"] + report["nodes"]) / 100,
+        )
+
+    def test_typed_storage_is_payload(self):
+        dynamic_array = data_structures.DynamicArray(dtype="i4")
+        dynamic_array.extend(range(1000))
+        report = dynamic_array.memory_usage(deep=False)
+        self.assertEqual(report["payload"], 4000)
+        self.assertEqual(report["nodes"], 0)
+        self.assertLess(report["overhead_per_element"], 1)
+
+    def test_matches_allocations(self):
+        values = random.Random(0).sample(range(10**6, 2 * 10**6), 2000)
+        for factory, method in [
+            (data_structures.SinglyLinkedList, "append"),
+            (lambda: data_structures.DoublyLinkedList(indexed=True), "append"),
+            (data_structures.BinarySearchTree, "insert"),
+            (lambda: data_structures.BTree(fanout=8), "insert"),
+            (data_structures.SkipList, "insert"),
+            (data_structures.Queue, "enqueue"),
+            (data_structures.CompactDoublyLinkedList, "append"),
+        ]:
+            tracemalloc.start()
+            structure = factory()
+            add = getattr(structure, method)
+            for value in values:
+                add(value)
+            allocated, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            reported = structure.memory_usage(deep=False)["total"]
+            self.assertAlmostEqual(reported / allocated, 1, delta=0.05)
+
+    def test_empty(self):
+        for structure in [
+            data_structures.SinglyLinkedList(),
+            data_structures.BinarySearchTree(),
+            data_structures.BTree(),
+            data_structures.Cache(4),
+            data_structures.AsyncQueue(),
+        ]:
+            report = structure.memory_usage()
+            self.assertEqual(report["elements"], 0)
+            self.assertEqual(report["overhead_per_element"], 0.0)
+            self.assertGreater(report["container"], 0)
+
 
 if __name__ == "__main__":
     unittest.main()